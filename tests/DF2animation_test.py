@@ -0,0 +1,115 @@
+import stat
+import sys
+
+import matplotlib as mpl
+import numpy as np
+import pandas as pd
+
+from ttlab import DF2animation
+
+
+def _frames_df():
+    t = np.linspace(0, 1, 40)
+    return pd.concat([pd.DataFrame({"fname": name, "t": t, "v": np.sin(6 * t + k)})
+                      for k, name in enumerate(["b", "a", "c"])], ignore_index=True)
+
+
+def _spec(df):
+    x, y, starts, labels = DF2animation._group_arrays(df, "t", "v", "fname")
+    return dict(x=x, y=y, starts=starts, labels=labels, figsize=(6, 3), x_label="t",
+                y_label="v", title=None, xlim=(0, 1), ylim=(-1, 1), legend_title="Files")
+
+
+def test_group_arrays_keep_first_appearance_order():
+    df = _frames_df().sample(frac=1, random_state=0).sort_values("t", kind="stable")
+    x, y, starts, labels = DF2animation._group_arrays(df, "t", "v", "fname")
+    assert list(labels) == list(df["fname"].unique())
+    assert list(starts) == [0, 40, 80, 120]
+    first = df[df["fname"] == labels[0]]
+    assert np.array_equal(y[:40], first["v"].values)
+
+    # rows without a group are skipped
+    df.loc[df.index[::7], "fname"] = None
+    x, y, starts, labels = DF2animation._group_arrays(df, "t", "v", "fname")
+    kept = df.dropna(subset=["fname"])
+    assert list(labels) == list(kept["fname"].unique())
+    assert starts[-1] == len(x) == len(kept)
+    assert np.array_equal(y[:starts[1]], kept.loc[kept["fname"] == labels[0], "v"].values)
+
+
+def test_blitted_frames_match_full_redraw():
+    df = _frames_df()
+    spec = _spec(df)
+    frames = [5, 39, 45, 100]
+    blitted = [np.array(buffer) for buffer in DF2animation._iter_frames(spec, frames)]
+    for frame, image in zip(frames, blitted):
+        group = np.searchsorted(spec["starts"][1:], frame, side="right")
+        with mpl.rc_context({'font.size': 20}):
+            fig, canvas, ax, lines, entries = DF2animation._build_figure(spec)
+            for i, line in enumerate(lines):
+                stop = spec["starts"][i + 1] if i < group else frame + 1
+                if i <= group:
+                    line.set_data(spec["x"][spec["starts"][i]:stop], spec["y"][spec["starts"][i]:stop])
+                    for artist in entries[i]:
+                        artist.set_visible(True)
+            canvas.draw()
+            reference = np.array(canvas.buffer_rgba())
+        assert image.shape == reference.shape
+        assert np.mean(image != reference) < 1e-3
+
+
+STUB_FFMPEG = """#!{python}
+# ffmpeg stand-in: an encode writes the number of complete rgba frames read
+# from stdin, a concat joins the segment files listed in the -i file
+import sys
+args = sys.argv[1:]
+output = args[-1]
+if "concat" in args:
+    with open(args[args.index("-i") + 1]) as listing:
+        paths = [line.split("'")[1] for line in listing if line.strip()]
+    with open(output, "w") as out:
+        for path in paths:
+            out.write(open(path).read())
+else:
+    width, height = map(int, args[args.index("-s") + 1].split("x"))
+    data = sys.stdin.buffer.read()
+    frame = width * height * 4
+    with open(output, "w") as out:
+        out.write(f"{{len(data) // frame}} {{len(data) % frame}}\\n")
+"""
+
+
+def test_animate_plot_pipes_frames_to_ffmpeg(tmp_path):
+    stub = tmp_path / "ffmpeg"
+    stub.write_text(STUB_FFMPEG.format(python=sys.executable))
+    stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+    t = np.linspace(0, 1, 25)
+    df = pd.concat([pd.DataFrame({"fname": f"f{k}", "t": t, "v": np.cos(4 * t + k)})
+                    for k in range(4)], ignore_index=True)
+
+    with mpl.rc_context({"animation.ffmpeg_path": str(stub)}):
+        serial = tmp_path / "serial.mp4"
+        DF2animation.animate_plot(df, "t", "v", output_file=str(serial),
+                                  figsize=(3, 2), frame_skip=1)
+        assert serial.read_text().split() == ["100", "0"]
+
+        parallel = tmp_path / "parallel.mp4"
+        DF2animation.animate_plot(df, "t", "v", output_file=str(parallel),
+                                  figsize=(3, 2), frame_skip=1, workers=3)
+        assert parallel.read_text().split() == ["34", "0", "33", "0", "33", "0"]
+
+        # rows without a group get no frames
+        df.loc[[0, 30], "fname"] = None
+        DF2animation.animate_plot(df, "t", "v", output_file=str(serial),
+                                  figsize=(3, 2), frame_skip=1)
+        assert serial.read_text().split() == ["98", "0"]
+
+
+if __name__ == "__main__":
+    test_group_arrays_keep_first_appearance_order()
+    test_blitted_frames_match_full_redraw()
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_animate_plot_pipes_frames_to_ffmpeg(pathlib.Path(tmp))
+    print("All tests passed.")
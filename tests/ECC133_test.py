@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ttlab import ECC133
+
+IDVG_CSV = """SetupTitle, IdVg
+PrimitiveTest, Id-Vg sweep
+TestParameter, Channel.Unit, SMU1:MP, SMU2:MP
+AnalysisSetup, Analysis.Setup.Vector.Graph.SetupInfo, Vd\t0.05,1.0
+Dimension1, 3, 3
+Dimension2, 2, 2
+DataName, Vg, Id, Ig
+DataValue, 0, 1e-12, 1e-14
+DataValue, 0.5, 1e-09, 2e-14
+DataValue, 1, 1e-06, 3e-14
+DataValue, 0, 2e-12, 1e-14
+DataValue, 0.5, 2e-09, 2e-14
+DataValue, 1, 2e-06, 3e-14
+"""
+
+CV_CSV = """SetupTitle, CV
+PrimitiveTest, C-V Sweep
+TestParameter, Measurement.Secondary.Frequency, 1000, 100000
+Dimension1, 2, 2
+DataName, V, C
+DataValue, -1, 1e-12
+DataValue, 1, 2e-12
+DataValue, -1, 1.1e-12
+DataValue, 1, 2.1e-12
+"""
+
+
+def test_header_scanner_matches_helpers(tmp_path):
+    path = tmp_path / "dev-1.csv"
+    path.write_text(IDVG_CSV)
+    header = ECC133.scan_ECC133_header(path)
+    assert header.primitive_test == ECC133.check_type(path)
+    assert (header.start_line, header.dimension1) == ECC133.find_start_line(path)
+    assert (header.var2_name, header.var2_values) == ECC133.find_var2(path)
+    assert header.freqs is None
+
+    df = ECC133.read_ECC133_csv(path)
+    assert list(df.columns) == ["DataName", "Vg", "Id", "Ig", "Vd"]
+    assert np.allclose(df["Id"], [1e-12, 1e-9, 1e-6, 2e-12, 2e-9, 2e-6])
+    assert list(df["Vd"]) == ["0.05"] * 3 + ["1.0"] * 3
+    ref = pd.read_csv(path, skiprows=header.start_line)
+    assert np.array_equal(df["Ig"].values, ref[" Ig"].values)
+
+
+def test_read_cv_sweep_frequencies(tmp_path):
+    path = tmp_path / "cv.csv"
+    path.write_text(CV_CSV)
+    assert ECC133.scan_ECC133_header(path).freqs == ECC133.find_freq(path) == [1000, 100000]
+    df = ECC133.read_ECC133_csv(path)
+    assert list(df["Freq"]) == [1000, 1000, 100000, 100000]
+
+
+def test_load_ECC133_folder_groups_by_measure_type(tmp_path):
+    for name in ["C1R2_transfer-10", "C1R2_transfer-2", "C1R1_transfer"]:
+        (tmp_path / f"{name}.csv").write_text(IDVG_CSV)
+    (tmp_path / "cv-1.csv").write_text(CV_CSV)
+    (tmp_path / "bad-1.csv").write_text("SetupTitle, ?\nPrimitiveTest, Pulse\n")
+
+    frames, failures, warnings = ECC133.load_ECC133_folder(tmp_path)
+    assert warnings == {}
+    assert set(frames) == {"Id-Vg sweep", "C-V Sweep"}
+    assert list(failures) == ["bad-1.csv"] and "Unknown measure type" in failures["bad-1.csv"]
+    idvg = frames["Id-Vg sweep"]
+    assert list(idvg["fname"].cat.categories) == ["C1R1_transfer", "C1R2_transfer-2", "C1R2_transfer-10"]
+    assert len(idvg) == 18 and idvg["Vd"].dtype == "category"
+
+    parallel, _, _ = ECC133.load_ECC133_folder(tmp_path, workers=2)
+    assert parallel["Id-Vg sweep"].equals(idvg)
+
+    no_var2 = "".join(line for line in IDVG_CSV.splitlines(keepends=True)
+                      if not line.startswith("AnalysisSetup"))
+    (tmp_path / "novar2-1.csv").write_text(no_var2)
+    frames, failures, warnings = ECC133.load_ECC133_folder(tmp_path, pattern="novar2-*.csv")
+    assert failures == {} and warnings == {"novar2-1.csv": "Second Variable Not found!"}
+    assert list(frames["Id-Vg sweep"].columns) == ["DataName", "Vg", "Id", "Ig", "fname"]
+
+    # a C-V file with a SetupInfo line has no var2 column to categorize
+    (tmp_path / "cvsetup-1.csv").write_text(CV_CSV.replace(
+        "Dimension1", "AnalysisSetup, Analysis.Setup.Vector.Graph.SetupInfo, Vd\t0.05,1.0\nDimension1"))
+    frames, failures, _ = ECC133.load_ECC133_folder(tmp_path, pattern="cvsetup-*.csv")
+    assert failures == {} and "Vd" not in frames["C-V Sweep"]
+
+
+def test_compact_frames(tmp_path):
+    (tmp_path / "dev-1.csv").write_text(IDVG_CSV)
+    (tmp_path / "cv-1.csv").write_text(CV_CSV)
+    (tmp_path / "iv-1.csv").write_text(IDVG_CSV.replace("Id-Vg sweep", "I/V Sweep")
+                                       .replace("2e-09", "NaN?"))
+    full = ECC133.read_ECC133_csv(tmp_path / "dev-1.csv")
+    df = ECC133.read_ECC133_csv(tmp_path / "dev-1.csv", compact=True, float_dtype="float32")
+    assert df["DataName"].dtype == "category"
+    assert (df[["Vg", "Id", "Ig"]].dtypes == np.float32).all()
+    assert np.allclose(df["Id"], full["Id"], rtol=1e-6)
+    assert df["Vd"].dtype == "category" and df["Vd"].cat.categories.dtype == np.float32
+    assert list(df["Vd"]) == [np.float32(0.05)] * 3 + [1.0] * 3
+
+    cv = ECC133.read_ECC133_csv(tmp_path / "cv-1.csv", compact=True)
+    assert cv["Freq"].dtype == np.uint32 and list(cv["Freq"]) == [1000, 1000, 100000, 100000]
+
+    iv = ECC133.read_ECC133_csv(tmp_path / "iv-1.csv", compact=True)
+    assert iv["Id"].dtype == np.float64 and iv["Id"].isna().sum() == 1
+
+    frames, _, _ = ECC133.load_ECC133_folder(tmp_path, pattern="dev-*.csv", compact=True)
+    vd = frames["Id-Vg sweep"]["Vd"]
+    assert vd.dtype == "category" and vd.cat.categories.dtype == np.float64
+
+
+LOOP_CSV = """SetupTitle, IdVg
+PrimitiveTest, Id-Vg sweep
+AnalysisSetup, Analysis.Setup.Vector.Graph.SetupInfo, Vd\t0.05,1.0
+Dimension1, 4, 4
+DataName, Vg, Id
+DataValue, 0, 1
+DataValue, 1, 2
+DataValue, 1, 4
+DataValue, 0, 3
+DataValue, 0, 10
+DataValue, 1, 20
+DataValue, 1, 40
+DataValue, 0, 30
+"""
+
+
+def test_compact_frames_split_sweeps_by_var2(tmp_path):
+    path = tmp_path / "loop-1.csv"
+    path.write_text(LOOP_CSV)
+    full = ECC133.read_ECC133_csv(path)
+    compact = ECC133.read_ECC133_csv(path, compact=True, float_dtype="float32")
+
+    averaged = ECC133.average_forward_backward_groups(compact)
+    assert averaged["Vd"].dtype == compact["Vd"].dtype
+    assert list(averaged["Vd"]) == [np.float32(0.05)] * 2 + [1.0] * 2
+    assert np.allclose(averaged["Id"], [2, 3, 20, 30])
+    assert np.allclose(averaged["Id"], ECC133.average_forward_backward_groups(full)["Id"])
+
+    metrics = ECC133.hysteresis(compact, "Vg", "Id", target=2.5, log=False)
+    reference = ECC133.hysteresis(full, "Vg", "Id", target=2.5, log=False)
+    assert len(metrics) == 2
+    assert np.allclose(metrics["delta_V"], reference["delta_V"], equal_nan=True)
+    assert np.allclose(metrics["loop_area"], [2, 20]) and np.allclose(reference["loop_area"], [2, 20])
+
+    # a file without var2 stacks both loops into one NaN-keyed group
+    (tmp_path / "loop-2.csv").write_text("".join(
+        line for line in LOOP_CSV.splitlines(keepends=True) if not line.startswith("AnalysisSetup")))
+    frames, _, _ = ECC133.load_ECC133_folder(tmp_path, pattern="loop-*.csv")
+    with pytest.raises(ValueError, match="'fname': 'loop-2'.* has 8 rows, the first group has 4"):
+        ECC133.average_forward_backward_groups(frames["Id-Vg sweep"])
+
+
+def _hysteresis_family():
+    # two Id-Vg loops; the backward sweep is shifted by +0.1 V and +0.2 V
+    vg = np.linspace(0, 2, 201)
+    frames = []
+    for vd, shift in (("0.05", 0.1), ("1.0", 0.2)):
+        fwd = 1e-12 * 10 ** (4 * vg)
+        bwd = 1e-12 * 10 ** (4 * (vg[::-1] - shift))
+        frames.append(pd.DataFrame({"DataName": "DataValue", "Vg": np.r_[vg, vg[::-1]],
+                                    "Id": np.r_[fwd, bwd], "Vd": vd}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_forward_backward_groups_and_hysteresis():
+    df = _hysteresis_family()
+    averaged = ECC133.average_forward_backward_groups(df)
+    assert len(averaged) == 402
+    assert list(averaged["Vd"].unique()) == ["0.05", "1.0"]
+    single = ECC133.average_forward_backward(df.iloc[:402])
+    assert np.allclose(averaged.loc[:200, ["Vg", "Id"]].values, single.values)
+
+    metrics = ECC133.hysteresis(df, "Vg", "Id", target=1e-8)
+    assert list(metrics["Vd"]) == ["0.05", "1.0"]
+    assert np.allclose(metrics["delta_V"], [0.1, 0.2], atol=1e-9)
+    assert (metrics["loop_area"] > 0).all()
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_header_scanner_matches_helpers(pathlib.Path(tmp))
+        test_read_cv_sweep_frequencies(pathlib.Path(tmp))
+        test_load_ECC133_folder_groups_by_measure_type(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_compact_frames(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_compact_frames_split_sweeps_by_var2(pathlib.Path(tmp))
+    test_forward_backward_groups_and_hysteresis()
+    print("All tests passed.")
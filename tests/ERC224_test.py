@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from ttlab import ERC224
+
+SAMPLE_MDM = """! VERSION = 6.00
+BEGIN_HEADER
+ ICCAP_INPUTS
+  Vd V D GROUND SMU1 0.1 LIN 1 0 0.2 3 0.1
+  Vg V G GROUND SMU2 0.1 LIST 2 2 0.5 1.0
+ ICCAP_OUTPUTS
+  Id I D GROUND SMU1 B
+END_HEADER
+
+BEGIN_DB
+ ICCAP_VAR Vg 0.5
+ ICCAP_VAR Temp 300
+
+ #Vd Id
+ 0 0
+ 0.1 1.5e-06
+ 0.2 2.5e-06
+END_DB
+
+BEGIN_DB
+ ICCAP_VAR Vg 1.0
+ ICCAP_VAR Temp 300
+
+ #Vd Id
+ 0 0
+ 0.1 3e-06
+ 0.2 5e-06
+END_DB
+"""
+
+
+def write_sample(tmp_path, name="sample.mdm"):
+    path = tmp_path / name
+    path.write_text(SAMPLE_MDM)
+    return path
+
+
+def test_mdm2df_long_format_floats(tmp_path):
+    df = ERC224.mdm2df(write_sample(tmp_path))
+    expected = pd.DataFrame({
+        "Vd": [0, 0.1, 0.2, 0, 0.1, 0.2],
+        "Vg": [0.5, 0.5, 0.5, 1.0, 1.0, 1.0],
+        "Id": [0, 1.5e-06, 2.5e-06, 0, 3e-06, 5e-06],
+        "Temp": [300.0] * 6,
+    })
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_mdm2df_agrees_with_read_mdm_multiple(tmp_path):
+    path = write_sample(tmp_path)
+    df = ERC224.mdm2df(path)
+    blocks = ERC224.read_mdm_multiple(path, "Vg")
+    for vg, block in blocks.items():
+        part = df[df["Vg"] == vg]
+        assert np.array_equal(part[["Vd", "Id"]].values, block[["Vd", "Id"]].values)
+
+
+def test_mdm_index_random_access(tmp_path):
+    path = write_sample(tmp_path)
+    index = ERC224.index_mdm(path, sidecar=True)
+    assert len(index) == 2
+    assert (tmp_path / "sample.mdm.idx.json").exists()
+    block = index.get_block(Vg=1.0)
+    assert list(block.columns) == ["Vd", "Id"]
+    assert np.allclose(block["Id"], [0, 3e-06, 5e-06])
+    assert index.get_block(Vg="0.5", Temp=300).equals(ERC224.read_mdm_multiple(path, "Vg")[0.5])
+
+    reloaded = ERC224.index_mdm(path, sidecar=True)
+    assert reloaded.blocks == index.blocks
+    try:
+        index.get_block(Vg=2.0)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("missing block not reported")
+
+
+def test_read_mdm_array_nested_sweeps(tmp_path):
+    blocks = []
+    for vb in (0.0, -1.0):
+        for vg in (0.5, 1.0, 1.5):
+            rows = "".join(f" {vd} {vd * vg * (1 - vb)}\n" for vd in (0.0, 0.1, 0.2, 0.3))
+            blocks.append(f"BEGIN_DB\n ICCAP_VAR Vb {vb}\n ICCAP_VAR Vg {vg}\n\n"
+                          f" #Vd Id\n{rows}END_DB\n\n")
+    path = tmp_path / "family.mdm"
+    path.write_text(SAMPLE_MDM.split("BEGIN_DB")[0] + "".join(blocks))
+
+    values, coords, columns = ERC224.read_mdm_array(path)
+    assert values.shape == (2, 3, 4, 2) and values.dtype == np.float64
+    assert list(coords) == ["Vb", "Vg"]
+    assert np.array_equal(coords["Vg"], [0.5, 1.0, 1.5])
+    assert columns == ["Vd", "Id"]
+    vd, i_d = values[..., 0], values[..., 1]
+    expected = vd * coords["Vg"][None, :, None] * (1 - coords["Vb"])[:, None, None]
+    assert np.allclose(i_d, expected)
+
+
+def test_load_mdm_from_folder_parallel_and_cached(tmp_path, monkeypatch):
+    write_sample(tmp_path, "dev1.mdm")
+    write_sample(tmp_path, "dev2.mdm")
+    parallel = ERC224.load_mdm_from_folder(tmp_path, workers=2)
+    first = ERC224.load_mdm_from_folder(tmp_path, cache=True)
+    assert list(first) == ["dev1", "dev2"]
+    assert first["dev1"].equals(parallel["dev1"])
+    assert first["dev1"].equals(ERC224.read_mdm(tmp_path / "dev1.mdm"))
+
+    parsed = []
+    read_mdm = ERC224.read_mdm
+    monkeypatch.setattr(ERC224, "read_mdm", lambda path: parsed.append(path) or read_mdm(path))
+    again = ERC224.load_mdm_from_folder(tmp_path, cache=True)
+    assert parsed == []
+    assert all(again[k].equals(first[k]) for k in first)
+
+    (tmp_path / "dev2.mdm").write_text(SAMPLE_MDM.replace("1.5e-06", "4e-06"))
+    changed = ERC224.load_mdm_from_folder(tmp_path, cache=True)
+    assert [p.endswith("dev2.mdm") for p in map(str, parsed)] == [True]
+    assert changed["dev2"]["Id"].iloc[1] == 4e-06
+
+
+def test_plot_selected_data_decimates_traces():
+    import matplotlib
+    matplotlib.use("Agg")
+    x = np.linspace(0, 1, 100_001)
+    y = np.sin(40 * x) * np.exp(-x)
+    data = {"long": pd.DataFrame({"Vd": x, "Id": -y}), "short": pd.DataFrame({"Vd": x[:50], "Id": y[:50]})}
+    for method in ("minmax", "lttb"):
+        fig, ax = ERC224.plot_selected_data(data, ["long", "short"], "Vd", "Id", Abs=True,
+                                            yscal=1e3, max_points=500, method=method)
+        long_line, short_line = ax.get_lines()
+        assert len(long_line.get_xdata()) <= 500
+        assert len(short_line.get_xdata()) == 50
+        assert np.all(np.diff(long_line.get_xdata()) > 0)
+        if method == "minmax":
+            assert np.isclose(long_line.get_ydata().max(), np.abs(y).max() * 1e3)
+        matplotlib.pyplot.close(fig)
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_mdm2df_long_format_floats(pathlib.Path(tmp))
+        test_mdm2df_agrees_with_read_mdm_multiple(pathlib.Path(tmp))
+        test_mdm_index_random_access(pathlib.Path(tmp))
+        test_read_mdm_array_nested_sweeps(pathlib.Path(tmp))
+    print("All tests passed.")
@@ -0,0 +1,99 @@
+"""
+Benchmark of ERC224.mdm2df against the previous row-by-row implementation.
+
+Writes a synthetic IC-CAP .mdm file (Id-Vd family over Vg) and times both
+readers; the previous one concatenated a one-row DataFrame per data line.
+
+    python tests/benchmark_ERC224_mdm.py [n_points]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ttlab import ERC224
+
+
+def write_mdm(path, n_points, n_blocks=10):
+    per_block = max(1, n_points // n_blocks)
+    vd = np.linspace(0, 1.2, per_block)
+    with open(path, "w") as f:
+        f.write("BEGIN_HEADER\n ICCAP_INPUTS\n"
+                "  Vd V D GROUND SMU1 0.1 LIN 1 0 1.2 %d 0.01\n"
+                "  Vg V G GROUND SMU2 0.1 LIST 2 %d\n"
+                " ICCAP_OUTPUTS\n  Id I D GROUND SMU1 B\nEND_HEADER\n\n"
+                % (per_block, n_blocks))
+        for vg in np.linspace(0, 1.2, n_blocks):
+            f.write("BEGIN_DB\n ICCAP_VAR Vg %.6g\n\n #Vd Id\n" % vg)
+            for v in vd:
+                f.write(" %.6g %.6e\n" % (v, 1e-6 * vg * v))
+            f.write("END_DB\n\n")
+
+
+def concat_per_row_mdm2df(fpath):
+    # mdm2df before the columnar rewrite: one pd.concat per data line
+    mode = None
+    with open(fpath, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("BEGIN_HEADER"):
+                Columns = []
+                mode = "Header"
+                continue
+            elif line.startswith("END_HEADER"):
+                data = pd.DataFrame(columns=Columns)
+                mode = None
+                continue
+            elif line.startswith("BEGIN_DB"):
+                mode = "DB"
+                ICCAP_var = []
+                continue
+            elif line.startswith("END_DB"):
+                mode = None
+                continue
+            elif line.startswith("#"):
+                ICCAP_var = pd.DataFrame(ICCAP_var)
+                ICCAP_var_columns = ICCAP_var.iloc[:, 0].values
+                ICCAP_var_values = ICCAP_var.iloc[:, 1].values
+                ICCAP_var = pd.DataFrame([ICCAP_var_values], columns=ICCAP_var_columns)
+
+                data_column_name = line[1:].split()
+                mode = "Data"
+                continue
+
+            match mode:
+                case "Header":
+                    if "ICCAP" in line:
+                        continue
+                    Columns.append(line.split()[0])
+                case "DB":
+                    if line.startswith("ICCAP_VAR"):
+                        ICCAP_var.append(line.split()[-2:])
+                        continue
+                case "Data":
+                    temp = pd.DataFrame([line.split()], columns=data_column_name)
+                    for c_name in ICCAP_var_columns:
+                        temp[c_name] = ICCAP_var[c_name]
+                    data = pd.concat([data, temp], ignore_index=True)
+    return data
+
+
+if __name__ == "__main__":
+    n_points = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "synthetic.mdm"
+        write_mdm(path, n_points)
+        start = time.perf_counter()
+        ref = concat_per_row_mdm2df(path)
+        t_old = time.perf_counter() - start
+        start = time.perf_counter()
+        df = ERC224.mdm2df(path)
+        t_new = time.perf_counter() - start
+    pd.testing.assert_frame_equal(df, ref.astype(float))
+    print(f"{len(df)} data points")
+    print(f"row-by-row concat: {t_old:.3f} s")
+    print(f"columnar parser:   {t_new:.4f} s  ({t_old / t_new:.0f}x)")
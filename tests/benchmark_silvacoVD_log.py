@@ -0,0 +1,75 @@
+"""
+Benchmark of the bulk 'd' record parser in read_victory_log_to_dataframe.
+
+Writes a synthetic Victory .log with many 'd' lines and compares the
+reader against the original per-token float() loop.
+
+    python tests/benchmark_silvacoVD_log.py [n_rows]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ttlab import silvacoVD
+
+HEADER = """p 11 2 20 440 601 701 1047000 3 21 441 602 1047001
+Q 2 13 "Voltage #01"
+Q 3 13 "Voltage #02"
+Q 20 13 "Current #01"
+Q 21 13 "Current #02"
+"""
+
+
+def write_log(path, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.standard_normal((n_rows, 11)) * 10.0 ** rng.integers(-15, 5, (n_rows, 11))
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for row in values:
+            f.write("d " + " ".join("%.17g" % v for v in row) + "\n")
+
+
+def per_token_reader(file_path):
+    # The reader as it was before the bulk parser: one float() per token
+    data = []
+    column_map = {}
+    columns = []
+    with open(file_path, "r") as file:
+        for line in file:
+            if line.startswith("p"):
+                columns = line.split()[2:]
+            if line.startswith("Q"):
+                parts = line.split()
+                if parts[1] in columns:
+                    column_map[parts[1]] = " ".join(parts[3:]).strip('"')
+            if line.startswith("d"):
+                data.append([float(num) for num in line.split()[1:]])
+    column_names = [column_map.get(col, f"Column_{col}") for col in columns]
+    return pd.DataFrame(data, columns=column_names)
+
+
+def best_of(func, path, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "synthetic.log"
+        write_log(path, n_rows)
+        t_old, ref = best_of(per_token_reader, path)
+        t_new, df = best_of(silvacoVD.read_victory_log_to_dataframe, path)
+    pd.testing.assert_frame_equal(df, ref)
+    print(f"{n_rows} 'd' lines x 11 columns")
+    print(f"per-token float(): {t_old:.3f} s")
+    print(f"bulk parser:       {t_new:.3f} s  ({t_old / t_new:.1f}x)")
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ttlab import characterization
+
+
+def _diodes():
+    # three diodes: n = 1.2, 1.5, 2.0, series resistance bending the top end
+    V = np.linspace(0, 1, 101)
+    Vt = 1.38e-23 * 300 / 1.602e-19
+    n = np.array([1.2, 1.5, 2.0])[:, None]
+    Is = np.array([1e-14, 1e-12, 1e-10])[:, None]
+    I = Is * np.exp(V / (n * Vt))
+    I = np.where(V > 0.6, I[:, [60]] * (1 + (V - 0.6) * 2), I)
+    I[:, :5] = -1e-15  # noise floor around zero bias
+    return V, I, n.ravel(), Is.ravel()
+
+
+def test_ideality_factor_keeps_points_paired():
+    V, I, n, _ = _diodes()
+    fitted = characterization.calculate_ideality_factor(V, I[1], V_range=(0, 0.5))
+    assert fitted == pytest.approx(n[1], rel=1e-6)
+
+
+def test_batch_ideality_factor_window_search():
+    V, I, n, Is = _diodes()
+    fit = characterization.batch_ideality_factor(V, I, window=20)
+    assert np.allclose(fit.n, n, rtol=1e-6)
+    assert np.allclose(fit.Is, Is, rtol=1e-5)
+    assert np.all(fit.r2 > 0.999999) and np.all(fit.V_stop <= 0.6)
+
+    ranged = characterization.batch_ideality_factor(V, I, V_range=(0.1, 0.5))
+    assert np.allclose(ranged.n, n, rtol=1e-6)
+    assert ranged.V_start[0] == pytest.approx(0.1) and ranged.V_stop[0] == pytest.approx(0.5)
+
+    I_bad = np.vstack([I, np.full(101, -1.0)])
+    assert np.isnan(characterization.batch_ideality_factor(V, I_bad, window=20).n[-1])
+
+
+
+Q, EPS_S = 1.602e-19, 11.7 * 8.854e-14
+
+
+def _mos_cv(N, Cox, Vfb, area=1e-4):
+    # abrupt-depletion p-type MOS capacitor, clamped at the inversion minimum
+    V = np.linspace(-2, 2, 401)
+    inv_C2 = 1 / Cox ** 2 + 2 * np.clip(V - Vfb, 0, None) / (Q * EPS_S * N)
+    C = np.maximum(inv_C2 ** -0.5, 0.25 * Cox)
+    return V, C * area
+
+
+def test_cv_analysis_mos_batch():
+    Cox = 3.45e-7
+    curves = [_mos_cv(N, Cox, Vfb) for N, Vfb in [(1e16, -0.5), (1e17, -0.8)]]
+    V = curves[0][0]
+    C = np.stack([c for _, c in curves])
+    p = characterization.cv_analysis(V, C, area=1e-4)
+    assert np.allclose(p.Cox, Cox)
+    assert np.allclose(p.N, [1e16, 1e17], rtol=1e-6)
+    assert np.allclose(p.inv_C2, (C / 1e-4) ** -2)
+
+    # flat band from the flat-band capacitance of the abrupt model
+    Vt = 1.38e-23 * 300 / Q
+    debye = np.sqrt(EPS_S * Vt / (Q * np.array([1e16, 1e17])))
+    shift = Vt / 2 + Q * np.array([1e16, 1e17]) * debye / Cox
+    assert np.allclose(p.Vfb, np.array([-0.5, -0.8]) + shift, atol=2e-3)
+
+    i = np.searchsorted(V, -0.48)
+    W = EPS_S * (np.sqrt(Cox ** -2 + 2 * 0.02 / (Q * EPS_S * 1e16)) - 1 / Cox)
+    assert p.depth[0, i] == pytest.approx(W, rel=1e-6)
+
+
+def test_cv_summary_schottky_per_frequency():
+    V = np.linspace(-3, 0.3, 100)
+    rows = []
+    for fname, N, Vbi in [("d1", 1e16, 0.7), ("d2", 5e16, 0.6)]:
+        for freq in (1000, 100000):
+            C = 1e-4 * np.sqrt(Q * EPS_S * N / (2 * (Vbi - V)))
+            rows.append(pd.DataFrame({"V": V, "C": C, "Freq": freq, "fname": fname}))
+    df = pd.concat(rows, ignore_index=True)
+    summary = characterization.cv_summary(df, area=1e-4, mos=False)
+    assert list(summary.index) == [("d1", 1000), ("d1", 100000), ("d2", 1000), ("d2", 100000)]
+    assert np.allclose(summary["N"], [1e16, 1e16, 5e16, 5e16], rtol=1e-6)
+    assert np.allclose(summary["V_intercept"], [0.7, 0.7, 0.6, 0.6], atol=1e-6)
+    assert summary["Vfb"].isna().all()
+
+    # a single sweep without fname or Freq columns is one curve
+    single = characterization.cv_summary(rows[0][["V", "C"]], area=1e-4, mos=False)
+    assert len(single) == 1
+    assert single["N"].iloc[0] == pytest.approx(1e16, rel=1e-6)
+
+
+if __name__ == "__main__":
+    test_ideality_factor_keeps_points_paired()
+    test_batch_ideality_factor_window_search()
+    test_cv_analysis_mos_batch()
+    test_cv_summary_schottky_per_frequency()
+    print("All tests passed.")
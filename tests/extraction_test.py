@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from ttlab import ECC133, extraction
+from ECC133_test import IDVG_CSV
+
+
+def _transfer_family():
+    # softplus Id-Vg: exponential below Vt with SS = s*ln(10), linear above
+    Vg = np.linspace(-1, 2, 301)
+    Vt = np.array([0.3, 0.5, 0.7])[:, None, None]      # device
+    k = np.array([1e-5, 2e-5])[None, :, None]           # var2 (Vd)
+    s = 0.03
+    x = (Vg - Vt) / s
+    Id = k * s * np.logaddexp(0, x) + 1e-14
+    return Vg, Id, Vt.ravel(), k.ravel(), s
+
+
+def test_extract_transfer_batch():
+    Vg, Id, Vt, k, s = _transfer_family()
+    p = extraction.extract_transfer(Vg, Id, W=10, L=1, Cox=1e-7, Vd=np.array([[0.05, 0.1]]))
+    assert p.Vth.shape == (3, 2)
+    assert np.allclose(p.Vth, Vt[:, None], atol=1e-3)
+    assert np.allclose(p.gm_max, k[None, :], rtol=1e-3)
+    assert np.allclose(p.SS, s * np.log(10) * 1e3, rtol=0.02)
+    assert np.allclose(p.mobility, k[None, :] / (10 * 1e-7 * np.array([0.05, 0.1])), rtol=1e-3)
+    assert np.allclose(p.on_off, p.Ion / p.Ioff)
+
+    # p-type mirror gives the mirrored threshold
+    mirrored = extraction.extract_transfer(-Vg, -Id, polarity=-1)
+    assert np.allclose(mirrored.Vth, -p.Vth)
+    assert np.isnan(mirrored.mobility).all()
+
+    # NaN-padded and empty curves
+    Id_pad = Id.copy()
+    Id_pad[0, 0, 250:] = np.nan
+    Id_pad[2, 1] = np.nan
+    padded = extraction.extract_transfer(Vg, Id_pad)
+    assert np.isfinite(padded.Vth[0, 0]) and np.isnan(padded.Vth[2, 1])
+
+
+def test_stack_curves_round_trip():
+    Vg, Id, _, _, _ = _transfer_family()
+    rows = [pd.DataFrame({"fname": f"dev-{d}", "Vd": vd, "Vg": Vg, "Id": Id[d, j]})
+            for d in range(3) for j, vd in enumerate(["0.05", "0.1"])]
+    df = pd.concat(rows[:-1], ignore_index=True)    # last curve missing
+    X, Y, levels = extraction.stack_curves(df.sample(frac=1, random_state=0).sort_index(),
+                                           "Vg", "Id", ["fname", "Vd"])
+    assert X.shape == (3, 2, 301)
+    assert list(levels[0]) == ["dev-0", "dev-1", "dev-2"] and levels[1].name == "Vd"
+    assert np.array_equal(Y[:2], Id[:2]) and np.array_equal(Y[2, 0], Id[2, 0])
+    assert np.isnan(Y[2, 1]).all()
+
+
+def test_stack_curves_mixed_folder(tmp_path):
+    # a file without var2 leaves NaN Vd keys after concatenation
+    (tmp_path / "dev-1.csv").write_text(IDVG_CSV)
+    (tmp_path / "dev-2.csv").write_text("".join(
+        line for line in IDVG_CSV.splitlines(keepends=True)
+        if not line.startswith("AnalysisSetup")))
+    frames, failures, _ = ECC133.load_ECC133_folder(tmp_path)
+    assert failures == {}
+    Vg, Id, levels = extraction.stack_curves(frames["Id-Vg sweep"], "Vg", "Id", ["fname", "Vd"])
+    assert Id.shape == (2, 3, 6)
+    assert list(levels[1][:2]) == ["0.05", "1.0"] and pd.isna(levels[1][2])
+    assert np.isnan(Id[1, :2]).all() and np.isnan(Id[0, 2]).all()
+    assert np.isfinite(Id[1, 2]).all()
+    p = extraction.extract_transfer(Vg, Id)
+    assert p.Vth.shape == (2, 3) and np.isfinite(p.Ion[1, 2]) and np.isnan(p.Ion[1, 0])
+
+
+if __name__ == "__main__":
+    test_extract_transfer_batch()
+    test_stack_curves_round_trip()
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_stack_curves_mixed_folder(pathlib.Path(tmp))
+    print("All tests passed.")
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from ttlab import semi_physics
+
+
+def test_material_models_broadcast():
+    assert semi_physics.bandgap("si", 0) == pytest.approx(1.170)
+    assert semi_physics.bandgap("Si", 300) == pytest.approx(1.1245, abs=1e-4)
+    Nc, Nv = semi_physics.density_of_states("GaAs", 600)
+    assert Nc == pytest.approx(4.7e17 * 2 ** 1.5)
+
+    T = np.array([250.0, 300.0, 400.0])[:, None]
+    ni = semi_physics.intrinsic_concentration("Si", T)
+    p = semi_physics.MATERIALS["Si"]
+    expected = semi_physics.intrinsic_carrier_concentration(
+        p["Nc"] * (T / 300) ** 1.5, p["Nv"] * (T / 300) ** 1.5,
+        semi_physics.bandgap("Si", T), T)
+    assert np.allclose(ni, expected) and np.all(np.diff(ni[:, 0]) > 0)
+
+    N = np.logspace(14, 20, 7)
+    mu = semi_physics.mobility("Si", N, T)
+    assert mu.shape == (3, 7)
+    assert np.all(np.diff(mu, axis=1) < 0) and np.all(np.diff(mu, axis=0) < 0)
+    assert semi_physics.mobility("Si", 1.0) == pytest.approx(1417.0, rel=1e-6)
+    assert semi_physics.mobility("Si", 1e22, carrier="p") == pytest.approx(44.9, rel=1e-2)
+
+    with pytest.raises(ValueError):
+        semi_physics.bandgap("unobtainium", 300)
+
+
+def test_material_table_matches_models():
+    table = semi_physics.material_table("4H-SiC", T_range=(250.0, 700.0), n_T=2001)
+    assert semi_physics.material_table("4H-SiC", T_range=(250.0, 700.0), n_T=2001) is table
+    T = np.random.default_rng(0).uniform(250, 700, 1000)
+    assert np.allclose(table.bandgap(T), semi_physics.bandgap("4H-SiC", T), rtol=1e-7)
+    assert np.allclose(table.density_of_states(T)[1], semi_physics.density_of_states("4H-SiC", T)[1], rtol=1e-6)
+    assert np.allclose(table.intrinsic_concentration(T),
+                       semi_physics.intrinsic_concentration("4H-SiC", T), rtol=1e-3)
+
+
+def test_tridiagonal_solver_matches_dense():
+    rng = np.random.default_rng(1)
+    for n in (1, 2, 7, 100):
+        a, c, d = rng.random((3, 4, n))
+        b = 2.5 + rng.random((4, n))
+        x = semi_physics._solve_tridiagonal(a, b, c, d)
+        for i in range(4):
+            A = np.diag(b[i]) + np.diag(a[i, 1:], -1) + np.diag(c[i, :-1], 1)
+            assert np.allclose(A @ x[i], d[i])
+
+
+def test_poisson_pn_junction_batch():
+    # non-uniform mesh refined around the junction at 1 um
+    s = np.linspace(-1, 1, 1501)
+    x = 1e-4 * (1 + np.sign(s) * s ** 2)
+    N = np.array([1e16, 1e17, 1e18])[:, None]
+    doping = np.where(x < 1e-4, -N, N)
+    sol = semi_physics.solve_poisson_1d(x, doping)
+    assert sol.converged.all() and sol.psi.shape == (3, 1501)
+
+    ni = semi_physics.intrinsic_concentration("Si", 300)
+    Vt = 8.617333262e-5 * 300
+    Vbi = Vt * np.log(N[:, 0] ** 2 / ni ** 2)
+    assert np.allclose(sol.psi[:, -1] - sol.psi[:, 0], Vbi)
+    eps = 11.7 * 8.854e-14
+    W = np.sqrt(2 * eps / 1.602e-19 * 2 / N[:, 0] * (Vbi - 2 * Vt))
+    assert np.allclose(sol.depletion_width, W, rtol=0.01)
+    assert np.allclose(sol.Ec - sol.Ev, semi_physics.bandgap("Si", 300))
+    assert np.all(sol.E[:, 750] < 0)
+
+    single = semi_physics.solve_poisson_1d(x, doping[1])
+    assert np.allclose(single.psi, sol.psi[1])
+
+
+if __name__ == "__main__":
+    test_material_models_broadcast()
+    test_material_table_matches_models()
+    test_tridiagonal_solver_matches_dense()
+    test_poisson_pn_junction_batch()
+    print("All tests passed.")
@@ -0,0 +1,374 @@
+import shlex
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ttlab import silvacoVD
+
+SAMPLE_STR = Path(__file__).parent / "test_data" / "silvacoVD" / "sample.str"
+
+
+def baseline_read_str_cutline(file_path, cutline):
+    # read_str_cutline before StrMesh: dict-of-sets parser, frozen as reference
+    mesh = defaultdict(lambda: {"x": set(), "y": set()})
+    data_keys = []
+    data_by_id = {}
+    id_to_x = {}
+    id_to_y = {}
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            if line.startswith('c '):
+                _, pid, xs, ys, _ = line.split()
+                pid = int(pid)
+                x, y = float(xs), float(ys)
+                id_to_x[pid] = x
+                id_to_y[pid] = y
+                mesh[x]['x'].add(pid)
+                mesh[y]['y'].add(pid)
+            elif line.startswith('s '):
+                data_keys = line.split()[1:]
+            elif line.startswith('n '):
+                parts = line.split()
+                pid = int(parts[1]) + 1
+                data_by_id[pid] = list(map(float, parts[2:]))
+            elif line.startswith('Q '):
+                parts = shlex.split(line)
+                ind, name = parts[1], parts[3]
+                for idx, key in enumerate(data_keys):
+                    if key == ind:
+                        data_keys[idx] = name
+
+    axis, pos = cutline
+    coords = [k for k, v in mesh.items() if v[axis]]
+    closest = min(coords, key=lambda c: abs(c - pos))
+    cut_ids = sorted(mesh[closest][axis])
+    df = pd.DataFrame({key: [data_by_id[pid][i] for pid in cut_ids]
+                       for i, key in enumerate(data_keys)})
+    df = df.drop(df.filter(regex=r'^\d+$').columns, axis=1)
+    if axis == 'x':
+        df['y'] = [id_to_y[pid] for pid in cut_ids]
+        df.sort_values(by='y', inplace=True)
+    else:
+        df['x'] = [id_to_x[pid] for pid in cut_ids]
+        df.sort_values(by='x', inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def _halfway(coords):
+    # first position exactly halfway between two adjacent mesh lines
+    u = np.unique(coords)
+    for a, b in zip(u[:-1], u[1:]):
+        mid = (a + b) / 2
+        if abs(a - mid) == abs(b - mid):
+            return float(mid)
+
+
+def test_str_cutline_matches_baseline_parser():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    cutlines = [("x", 0.0), ("x", 1.5), ("x", -7.0), ("y", 0.2), ("y", 0.013),
+                ("x", _halfway(mesh.x)), ("y", _halfway(mesh.y))]
+    for cutline in cutlines:
+        ref = baseline_read_str_cutline(SAMPLE_STR, cutline)
+        assert mesh.cutline(cutline).equals(ref), cutline
+        assert silvacoVD.read_str_cutline(SAMPLE_STR, cutline).equals(ref), cutline
+    assert mesh.cutline(("x", 0.0)).shape == (204, 44)
+
+
+def test_str_mesh_cutline_is_on_one_mesh_line():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    df = mesh.cutline(("x", 0.01))
+    ids = mesh.cutline_nodes(("x", 0.01))
+    assert len(np.unique(mesh.x[ids])) == 1
+    assert np.all(np.diff(df["y"].values) >= 0)
+    assert "Potential" in df.columns
+    assert not any(c.isdigit() for c in df.columns)
+
+
+def test_probe_reproduces_node_values():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    ids = np.setdiff1d(np.arange(0, len(mesh.x), 11), mesh.interface_nodes)
+    k = list(mesh.field_names).index("Potential")
+    df = mesh.probe(mesh.x[ids], mesh.y[ids], "Potential")
+    assert np.allclose(df["Potential"].values, mesh.data[ids, k])
+
+
+def test_probe_line_diagonal():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    df = mesh.probe_line((-1.0, 0.5), (1.0, 0.0), num=50, fields=["Potential"])
+    assert len(df) == 50
+    assert np.isclose(df["distance"].iloc[-1], np.hypot(2.0, 0.5))
+    assert not df["Potential"].isna().any()
+    outside = mesh.probe(5.0, 5.0, "Potential")
+    assert outside["Potential"].isna().all()
+
+
+SAMPLE_LOG = """p 3 2 20 3
+Q 2 13 "Voltage #01"
+Q 20 13 "Current #01"
+d 0 1e-12 0
+d 0.1 2.5e-11 1
+d 0.2 3.75e-10 2
+"""
+
+
+def test_parse_cache_roundtrip_and_invalidation(tmp_path):
+    log = tmp_path / "run.log"
+    log.write_text(SAMPLE_LOG)
+    cache = silvacoVD.ParseCache(tmp_path / "cache")
+
+    first = silvacoVD.read_victory_log_to_dataframe(log, cache=cache)
+    assert list(first.columns) == ["Voltage #01", "Current #01", "Column_3"]
+    assert len(list(cache.cache_dir.glob("*.npz"))) == 1
+    assert silvacoVD.read_victory_log_to_dataframe(log, cache=cache).equals(first)
+
+    # a rewritten file is a cache miss
+    log.write_text(SAMPLE_LOG + "d 0.3 1e-9 3\n")
+    assert len(silvacoVD.read_victory_log_to_dataframe(log, cache=cache)) == 4
+
+    mesh = silvacoVD.read_str(SAMPLE_STR, cache=cache)
+    cached = silvacoVD.read_str(SAMPLE_STR, cache=cache)
+    assert cached.cutline(("x", 0.0)).equals(mesh.cutline(("x", 0.0)))
+    assert cached.region_material == mesh.region_material
+
+    # a truncated entry is dropped and parsed again
+    for entry in cache.cache_dir.glob("*.npz"):
+        entry.write_bytes(entry.read_bytes()[:len(entry.read_bytes()) // 2])
+    assert len(silvacoVD.read_victory_log_to_dataframe(log, cache=cache)) == 4
+    assert silvacoVD.read_str(SAMPLE_STR, cache=cache).region_material == mesh.region_material
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    logs = []
+    for i in range(3):
+        log = tmp_path / f"run{i}.log"
+        log.write_text(SAMPLE_LOG)
+        logs.append(log)
+    cache = silvacoVD.ParseCache(tmp_path / "cache", max_bytes=0)
+    for log in logs:
+        silvacoVD.read_victory_log_to_dataframe(log, cache=cache)
+    assert list(cache.cache_dir.glob("*.npz")) == []
+
+
+def test_read_all_logs_parallel_matches_serial(tmp_path):
+    for vg in ["0.5", "1.0", "1.5"]:
+        (tmp_path / f"diode_Vg{vg}_Lg20.log").write_text(SAMPLE_LOG)
+    (tmp_path / "broken_Vg2.0.log").write_text("p 2 2 20\nd 0 x\n")
+
+    serial = silvacoVD.read_all_logs_in_directory(tmp_path)
+    parallel = silvacoVD.read_all_logs_in_directory(tmp_path, workers=2)
+    assert serial.equals(parallel)
+    assert len(serial) == 9
+    assert serial["Vg"].dtype == float
+    assert serial["name"].dtype == "category"
+    frames = list(silvacoVD.iter_logs_in_directory(tmp_path))
+    assert [df["Vg"].iloc[0] for df in frames] == [0.5, 1.0, 1.5]
+    frames = list(silvacoVD.iter_logs_in_directory(tmp_path, workers=2))
+    assert [df["Vg"].iloc[0] for df in frames] == [0.5, 1.0, 1.5]
+
+
+def test_bounded_pool_map_limits_outstanding_jobs():
+    pulled = []
+
+    def jobs():
+        for i in range(100):
+            pulled.append(i)
+            yield -i
+
+    results = silvacoVD._bounded_pool_map(abs, jobs(), workers=2)
+    assert next(results) == 0
+    assert len(pulled) <= 5
+    assert [next(results) for _ in range(3)] == [1, 2, 3]
+    assert len(pulled) <= 8
+    results.close()
+    assert len(pulled) <= 8
+    assert list(silvacoVD._bounded_pool_map(abs, range(-6, 0), workers=3)) == [6, 5, 4, 3, 2, 1]
+
+
+def test_log_bulk_parser_matches_float(tmp_path):
+    rows = ["-0 1e-300 2.2250738585072014e-308 0.1", "1.7976931348623157e308 -3.5 7 inf"]
+    log = tmp_path / "edge.log"
+    log.write_text("p 4 2 20 3 21\nQ 2 13 \"Voltage #01\"\n"
+                   + "".join(f"d {row}\n" for row in rows))
+    df = silvacoVD.read_victory_log_to_dataframe(log)
+    expected = np.array([[float(v) for v in row.split()] for row in rows])
+    assert np.array_equal(df.to_numpy(), expected)
+    assert list(df.columns) == ["Voltage #01", "Column_20", "Column_3", "Column_21"]
+
+    # ragged blocks fall back to per-line parsing
+    log.write_text("p 2 2 20\nd 1  2\nd 3\n")
+    df = silvacoVD.read_victory_log_to_dataframe(log)
+    assert df.shape == (2, 2) and np.isnan(df.iloc[1, 1])
+
+
+def test_victory_log_tail_reads_only_new_lines(tmp_path):
+    log = tmp_path / "running.log"
+    tail = silvacoVD.VictoryLogTail(log, capacity=2)
+    assert tail.poll() == 0
+
+    lines = SAMPLE_LOG.splitlines(keepends=True)
+    log.write_text("".join(lines[:4]) + lines[4][:5])
+    assert tail.poll() == 1
+    with open(log, "a") as f:
+        f.write(lines[4][5:] + lines[5] + "d 0.3 1e-9 3\n")
+    assert tail.poll() == 3
+    assert tail.poll() == 0
+    expected = silvacoVD.read_victory_log_to_dataframe(log)
+    assert tail.to_dataframe().equals(expected)
+
+    watcher = silvacoVD.VictoryLogDirectoryTail(tmp_path)
+    assert watcher.poll() == {"running.log": 4}
+    assert watcher.poll() == {}
+
+    # a new 'p' record with other columns after data is rejected, state kept
+    with open(log, "a") as f:
+        f.write("p 3 3 20 3 4\nd 0.4 1e-9 4 5\n")
+    with pytest.raises(ValueError, match="changes the columns"):
+        tail.poll()
+    assert tail.n_rows == 4 and tail.to_dataframe().equals(expected)
+
+
+def test_victory_log_tail_keeps_offset_on_bad_rows_and_follows_restarts(tmp_path):
+    log = tmp_path / "running.log"
+    tail = silvacoVD.VictoryLogTail(log)
+    log.write_text(SAMPLE_LOG)
+    assert tail.poll() == 3
+    offset = tail.offset
+
+    # an unparsable row leaves the offset, so the chunk is retried
+    with open(log, "a") as f:
+        f.write("d 0.3 bad 3\n")
+    with pytest.raises(ValueError):
+        tail.poll()
+    assert tail.offset == offset and tail.n_rows == 3
+
+    # the run restarts: the file is rewritten in place and grows past the offset
+    restarted = SAMPLE_LOG.replace("e-1", "e-0") + "d 0.3 4e-9 3\nd 0.4 5e-8 4\n"
+    log.write_text(restarted)
+    assert len(restarted) > offset
+    assert tail.poll() == 5
+    assert tail.to_dataframe().equals(silvacoVD.read_victory_log_to_dataframe(log))
+
+
+def test_region_and_material_reductions():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    assert mesh.material_names[3] == "Silicon"
+    total = mesh.area()
+    assert np.isclose(total, (mesh.x.max() - mesh.x.min()) * (mesh.y.max() - mesh.y.min()))
+    assert np.isclose(mesh.area(material="Silicon") + mesh.area(material="Gold"), total)
+    assert np.isclose(mesh.area(region=[2, 3]), mesh.area(material=3))
+    # lattice temperature is uniform, and gold keeps its own interface values
+    assert np.isclose(mesh.mean("Lattice Temperature"), 300.0)
+    assert np.isclose(mesh.integrate("Lattice Temperature", material="Gold"),
+                      300.0 * mesh.area(material="Gold"))
+    assert np.isclose(mesh.mean("Potential", material="Gold"), -2.5)
+    stats = mesh.max(["Potential", "Electric Field"], material="Silicon")
+    assert list(stats.index) == ["Potential", "Electric Field"]
+
+
+def test_rasterize_matches_probe_and_writes_memmap(tmp_path):
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    gx = np.linspace(-0.9, 0.9, 40)
+    gy = np.linspace(0.05, 1.25, 30)
+    grid = mesh.rasterize(["Potential", "Hole Conc"], gx, gy, chunk_size=500)
+    assert grid.shape == (2, 30, 40)
+    X, Y = np.meshgrid(gx, gy)
+    ref = mesh.interpolate(X.ravel(), Y.ravel(), ["Potential", "Hole Conc"])
+    assert np.allclose(grid.reshape(2, -1).T, ref)
+
+    path = tmp_path / "potential.npy"
+    mapped = mesh.rasterize("Potential", gx, np.append(gy, 9.0), out=path, dtype=np.float32)
+    assert mapped.shape == (31, 40)
+    on_disk = np.load(path)
+    assert on_disk.dtype == np.float32 and np.isnan(on_disk[0, -1]).all()
+
+
+def _shifted_copy(path, field_col, shift):
+    # copy of the sample with a constant added to one data column
+    lines = []
+    for line in SAMPLE_STR.read_text().splitlines(keepends=True):
+        if line.startswith("n "):
+            parts = line.split()
+            parts[2 + field_col] = repr(float(parts[2 + field_col]) + shift)
+            line = " ".join(parts) + "\n"
+        lines.append(line)
+    path.write_text("".join(lines))
+    return path
+
+
+def test_str_series_stacks_shared_mesh(tmp_path):
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    k = list(mesh.field_names).index("Potential")
+    files = [SAMPLE_STR] + [_shifted_copy(tmp_path / f"bias{i}.str", k, 0.1 * i)
+                            for i in (1, 2)]
+    series = silvacoVD.read_str_series(files, labels=[0.0, 0.1, 0.2])
+    assert series.data.shape == (3,) + mesh.data.shape
+
+    coord, values = series.cutline(("x", 0.0), ["Potential"])
+    assert values.shape == (3, len(coord), 1)
+    assert np.allclose(values[2] - values[0], 0.2)
+
+    probed = series.probe([0.0, 0.3], [0.5, 0.7], "Potential")
+    assert np.allclose(probed[1] - probed[0], 0.1)
+    single = series[2].probe([0.0, 0.3], [0.5, 0.7], "Potential")
+    assert np.allclose(single["Potential"].values, probed[2, :, 0])
+
+    moved = tmp_path / "moved.str"
+    moved.write_text(SAMPLE_STR.read_text().replace("c 1 -1 ", "c 1 -1.5 ", 1))
+    try:
+        silvacoVD.read_str_series([SAMPLE_STR, moved])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("mesh mismatch not detected")
+
+
+def test_derived_gradient_fields():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    mesh.add_field("plane", 2.0 * mesh.x - 3.0 * mesh.y)
+    assert mesh.add_gradient("plane") == ["d(plane)/dx", "d(plane)/dy"]
+    df = mesh.cutline(("y", 0.5))
+    assert np.allclose(df["d(plane)/dx"], 2.0)
+    assert np.allclose(df["d(plane)/dy"], -3.0)
+    probed = mesh.probe([0.1, -0.4], [0.2, 1.1], ["d(plane)/dx", "d(plane)/dy"])
+    assert np.allclose(probed[["d(plane)/dx", "d(plane)/dy"]].values, [2.0, -3.0])
+
+    # |grad V| in V/cm follows the stored field magnitude in the bulk
+    mesh.add_gradient("Potential", scale=1e4)
+    mesh.add_magnitude("|grad V|", "d(Potential)/dx", "d(Potential)/dy")
+    bulk = mesh.cutline(("x", 0.0)).query("y > 0.5")
+    assert np.allclose(bulk["|grad V|"], bulk["Electric Field"], rtol=1e-3)
+
+
+def test_streamlines_follow_vector_field():
+    mesh = silvacoVD.read_str(SAMPLE_STR)
+    mesh.add_field("ux", np.ones(len(mesh.x)))
+    mesh.add_field("uy", np.zeros(len(mesh.x)))
+    lines = mesh.streamlines("ux", "uy", [-0.45, -0.45], [0.3, 0.9], step=0.05, direction="both")
+    for _, line in lines.groupby("line"):
+        assert np.allclose(line["y"], line["y"].iloc[0])
+        assert np.allclose(np.diff(line["x"]), 0.05)
+        assert line["x"].min() >= mesh.x.min() and line["x"].max() <= mesh.x.max()
+        assert line["x"].max() > mesh.x.max() - 0.05
+    assert (lines.loc[lines["step"] == 0, "x"] == -0.45).all()
+
+    # along -grad V the potential only decreases
+    mesh.add_gradient("Potential")
+    mesh.add_field("-dV/dx", -mesh.data[:, list(mesh.field_names).index("d(Potential)/dx")])
+    mesh.add_field("-dV/dy", -mesh.data[:, list(mesh.field_names).index("d(Potential)/dy")])
+    path = mesh.streamlines("-dV/dx", "-dV/dy", 0.2, 0.6, max_steps=50)
+    assert len(path) > 10
+    potential = mesh.interpolate(path["x"], path["y"], "Potential")[:, 0]
+    assert np.all(np.diff(potential) < 1e-9)
+
+
+if __name__ == "__main__":
+    test_str_cutline_matches_baseline_parser()
+    test_str_mesh_cutline_is_on_one_mesh_line()
+    test_probe_reproduces_node_values()
+    test_probe_line_diagonal()
+    print("All tests passed.")
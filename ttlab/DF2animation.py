@@ -1,19 +1,143 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-import matplotlib.animation as animation
-from tqdm import tqdm
 import os
+import subprocess
+import tempfile
 import matplotlib as mpl
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def _group_arrays(df, x_col, y_col, group_col):
+    # x, y sorted by group (first-appearance order, rows kept in order),
+    # start offsets of every group and the group labels; rows without a
+    # group are dropped, as groupby does
+    codes, labels = pd.factorize(df[group_col])
+    keep = np.flatnonzero(codes >= 0)
+    order = keep[np.argsort(codes[keep], kind="stable")]
+    codes = codes[keep]
+    counts = np.bincount(codes, minlength=len(labels))
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    x = df[x_col].to_numpy()[order]
+    y = df[y_col].to_numpy()[order]
+    return x, y, starts, np.asarray(labels)
+
+
+def _build_figure(spec):
+    # Agg figure with axes, one line per group and the full (hidden) legend
+    fig = Figure(figsize=spec["figsize"])
+    # even pixel sizes for h264 / yuv420p
+    width, height = (int(size * fig.dpi) // 2 * 2 for size in spec["figsize"])
+    fig.set_size_inches(width / fig.dpi, height / fig.dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    # Adjust the subplot to make room on the right side for the legend
+    fig.subplots_adjust(right=0.75)
+    ax.set_xlabel(spec["x_label"], fontsize=12)
+    ax.set_ylabel(spec["y_label"], fontsize=12)
+    if spec["title"]:
+        ax.set_title(spec["title"], fontsize=14)
+    ax.grid(alpha=0.5)
+    ax.set_xlim(spec["xlim"])
+    ax.set_ylim(spec["ylim"])
+
+    lines = [ax.plot([], [], lw=2)[0] for _ in spec["labels"]]
+    legend = ax.legend(lines, spec["labels"], loc='center left', bbox_to_anchor=(1, 0.5),
+                       fontsize=10, title=spec["legend_title"])
+    handles = getattr(legend, "legend_handles", None) or legend.legendHandles
+    entries = list(zip(handles, legend.get_texts()))
+    for artist in (artist for entry in entries for artist in entry):
+        artist.set_visible(False)
+    return fig, canvas, ax, lines, entries
+
+
+def _iter_frames(spec, frames):
+    """
+    RGBA buffers of the given frames (indices into the grouped rows).
+
+    Completed groups and the legend are drawn into a cached background once
+    per group; every frame only restores it and draws the active line.
+    """
+    x, y, starts = spec["x"], spec["y"], spec["starts"]
+    frames = np.asarray(frames)
+    frame_group = np.searchsorted(starts[1:], frames, side='right')
+    with mpl.rc_context({'font.size': 20}):
+        fig, canvas, ax, lines, entries = _build_figure(spec)
+        current = None
+        background = None
+        for frame, group in zip(frames, frame_group):
+            if group != current:
+                # groups before `group` become complete, later ones empty
+                for i, line in enumerate(lines):
+                    done = i < group
+                    line.set_animated(i == group)
+                    line.set_data(x[starts[i]:starts[i + 1]] if done else [],
+                                  y[starts[i]:starts[i + 1]] if done else [])
+                    for artist in entries[i]:
+                        artist.set_visible(i <= group)
+                canvas.draw()
+                background = canvas.copy_from_bbox(fig.bbox)
+                current = group
+            canvas.restore_region(background)
+            start = starts[group]
+            lines[group].set_data(x[start:frame + 1], y[start:frame + 1])
+            ax.draw_artist(lines[group])
+            yield canvas.buffer_rgba()
+
+
+def _ffmpeg_path():
+    return mpl.rcParams['animation.ffmpeg_path']
+
+
+def _render_segment(args):
+    # Worker: encode one range of frames to a video file through ffmpeg
+    spec, frames, output_file = args
+    proc = None
+    try:
+        for buffer in _iter_frames(spec, frames):
+            if proc is None:
+                height, width = np.asarray(buffer).shape[:2]
+                command = [spec["ffmpeg"], '-y', '-loglevel', 'error',
+                           '-f', 'rawvideo', '-vcodec', 'rawvideo', '-pix_fmt', 'rgba',
+                           '-s', f'{width}x{height}', '-r', str(spec["fps"]), '-i', '-',
+                           '-vcodec', spec["codec"], '-pix_fmt', 'yuv420p',
+                           '-b:v', f'{spec["bitrate"]}k', '-metadata', 'artist=Me',
+                           output_file]
+                proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+            proc.stdin.write(buffer)
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            if proc.wait():
+                raise RuntimeError(f"ffmpeg failed while writing {output_file}")
+    return output_file
+
+
+def _concat_segments(segments, output_file, ffmpeg=None):
+    # Stitch encoded segments without re-encoding (ffmpeg concat demuxer)
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+        for segment in segments:
+            listing.write(f"file '{os.path.abspath(segment)}'\n")
+    try:
+        subprocess.run([ffmpeg or _ffmpeg_path(), '-y', '-loglevel', 'error', '-f', 'concat',
+                        '-safe', '0', '-i', listing.name, '-c', 'copy', output_file],
+                       check=True)
+    finally:
+        os.remove(listing.name)
+
 
 def animate_plot(df, x_col, y_col, group_col='fname', output_file='animation.mp4',
-                 x_label=None, y_label=None, title=None, 
-                 xlim=None, ylim=None, figsize=(12,6), 
-                 frame_skip=20, fps=20, legend_title="Files"):
+                 x_label=None, y_label=None, title=None,
+                 xlim=None, ylim=None, figsize=(12,6),
+                 frame_skip=20, fps=20, legend_title="Files", workers=1):
     """
     Creates an animated plot from a DataFrame and saves it as an .mp4 video file.
 
+    Groups are split once with a stable sort. Completed groups and the
+    legend are cached as a rendered background that is refreshed only when
+    a new group starts, so each frame draws just the active line.
+
     Parameters:
     - df: pandas DataFrame containing the data.
     - x_col: name of the column to use for x-axis.
@@ -29,107 +153,32 @@ def animate_plot(df, x_col, y_col, group_col='fname', output_file='animation.mp4
     - frame_skip: number of frames to skip in animation.
     - fps: frames per second for the animation.
     - legend_title: title for the legend.
+    - workers: processes rendering contiguous frame ranges in parallel; the
+      segments are joined with ffmpeg (None uses one process per CPU).
     """
-    mpl.rcParams['animation.ffmpeg_path']
-    # Precompute x and y data for each group
-    unique_group_names = df[group_col].unique()
-    group_to_xy = {}
-    group_lengths = []
-    for group_name in unique_group_names:
-        group = df[df[group_col] == group_name]
-        x = group[x_col].values
-        y = group[y_col].values
-        group_to_xy[group_name] = (x, y)
-        group_lengths.append((group_name, len(group)))
-
-    cum_lengths = np.cumsum([length for group_name, length in group_lengths])
-
-    # Initialize figure
-    fig, ax = plt.subplots(figsize=figsize)
-
-    # Adjust the subplot to make room on the right side for the legend
-    plt.subplots_adjust(right=0.75)
-
-    # Customize the plot
-    plt.rcParams.update({'font.size': 20})
-    if x_label:
-        ax.set_xlabel(x_label, fontsize=12)
-    else:
-        ax.set_xlabel(x_col, fontsize=12)
-    if y_label:
-        ax.set_ylabel(y_label, fontsize=12)
-    else:
-        ax.set_ylabel(y_col, fontsize=12)
-    if title:
-        ax.set_title(title, fontsize=14)
-    ax.grid(alpha=0.5)
-    if xlim:
-        ax.set_xlim(xlim)
-    else:
-        ax.set_xlim(df[x_col].min(), df[x_col].max())
-    if ylim:
-        ax.set_ylim(ylim)
-    else:
-        ax.set_ylim(df[y_col].min(), df[y_col].max())
-
-    # Initialize lines for each group
-    lines = []
-    num_data = len(group_lengths)
-    for _ in range(num_data):
-        line, = ax.plot([], [], lw=2)
-        lines.append(line)
-
-    labels = np.array([group_name for group_name, _ in group_lengths])
-
-    # Initialization function
-    def init():
-        for line in lines:
-            line.set_data([], [])
-        return lines
-
-    # Function to get group_name and index from frame
-    def get_group_and_index(frame):
-        group_index = np.searchsorted(cum_lengths, frame, side='right')
-        group_name, length = group_lengths[group_index]
-        frame_start = 0 if group_index == 0 else cum_lengths[group_index - 1]
-        index_within_group = frame - frame_start
-        return group_index, group_name, index_within_group
-
-    # Update function for animation
-    def update(frame):
-        group_index, now_group, index_within_group = get_group_and_index(frame)
-        
-        # Draw previous lines fully
-        for i in range(group_index):
-            group_name = group_lengths[i][0]
-            x, y = group_to_xy[group_name]
-            lines[i].set_data(x, y)
-        
-        # Draw current line progressively
-        x, y = group_to_xy[now_group]
-        lines[group_index].set_data(x[:index_within_group + 1], y[:index_within_group + 1])
-        
-        # Clear future lines
-        for i in range(group_index + 1, num_data):
-            lines[i].set_data([], [])
-        
-        # Update the legend outside the plot area
-        visible_labels = labels[:group_index + 1]
-        ax.legend(lines[:group_index + 1], visible_labels, loc='center left', bbox_to_anchor=(1, 0.5),
-                  fontsize=10, title=legend_title)
-        return lines
+    x, y, starts, labels = _group_arrays(df, x_col, y_col, group_col)
+    spec = dict(x=x, y=y, starts=starts, labels=labels, figsize=figsize,
+                x_label=x_label or x_col, y_label=y_label or y_col, title=title,
+                xlim=xlim or (df[x_col].min(), df[x_col].max()),
+                ylim=ylim or (df[y_col].min(), df[y_col].max()),
+                legend_title=legend_title, fps=fps, bitrate=1800,
+                # resolved here so worker processes use the caller's settings
+                ffmpeg=_ffmpeg_path(), codec=mpl.rcParams['animation.codec'])
 
     # Prepare frames
-    total_frames = len(df)
-    frames = list(range(0, total_frames, frame_skip))
-
-    # Create the animation using FuncAnimation
-    ani = FuncAnimation(fig, update, frames=frames, init_func=init, blit=True)
-
-    # Use FFMpegWriter to save the animation as an .mp4 file
-    Writer = animation.writers['ffmpeg']
-    writer = Writer(fps=fps, metadata=dict(artist='Me'), bitrate=1800)
+    frames = np.arange(0, len(x), frame_skip)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(frames)))
+    if workers == 1:
+        _render_segment((spec, frames, output_file))
+        return
 
-    # Save the animation
-    ani.save(output_file, writer=writer)
-    plt.close(fig)
\ No newline at end of file
+    from concurrent.futures import ProcessPoolExecutor
+    with tempfile.TemporaryDirectory() as tmp:
+        suffix = os.path.splitext(output_file)[1] or '.mp4'
+        jobs = [(spec, chunk, os.path.join(tmp, f"segment{i:04d}{suffix}"))
+                for i, chunk in enumerate(np.array_split(frames, workers))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            segments = list(pool.map(_render_segment, jobs))
+        _concat_segments(segments, output_file, spec["ffmpeg"])
@@ -12,6 +12,8 @@ import pandas as _pd
 import csv as _csv
 import re as _re
 from pathlib import Path as _Path
+from collections import namedtuple as _namedtuple
+from functools import partial as _partial
 
 def check_type(fpath):
     setuptitle = None
@@ -55,44 +57,154 @@ def find_start_line(filename, keyword="DataValue"):
     print(f"No Data -- {filename}")
     return None, None
 
-def read_ECC133_csv(fpath):
-    measure_type = check_type(fpath)
+ECC133Header = _namedtuple("ECC133Header", [
+    "primitive_test", "dimension1", "var2_name", "var2_values", "freqs",
+    "start_line", "data_offset"])
+ECC133Header.__doc__ = """
+Metadata of an ECC133 csv file, from scan_ECC133_header.
+
+primitive_test: measure type, e.g. "Id-Vg sweep" (None if missing).
+dimension1: points per sweep (Dimension1).
+var2_name, var2_values: second sweep variable and its values (strings).
+freqs: secondary frequencies of C-V sweeps (list of int) or None.
+start_line: line number of the data column header (pandas skiprows).
+data_offset: byte offset of the data column header, or None without data.
+"""
+
+
+def scan_ECC133_header(file, keyword="DataValue"):
+    """
+    Read the header of an ECC133 csv once, stopping at the first data line.
+
+    Collects what check_type, find_start_line, find_var2 and find_freq
+    each read the file for.
+
+    Args:
+        file: path, or a file opened in binary mode (it is left positioned
+            after the first data line).
+        keyword: marker of the data lines.
+
+    Returns:
+        ECC133Header
+    """
+    if not hasattr(file, "readline"):
+        with open(file, 'rb') as handle:
+            return scan_ECC133_header(handle, keyword)
+
+    setuptitle = cut = var2_name = var2_values = freqs = None
+    previous = None
+    offset = file.tell()
+    for i, raw in enumerate(iter(file.readline, b"")):
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if keyword in line:
+            return ECC133Header(setuptitle, cut, var2_name, var2_values, freqs, i - 1, previous)
+        previous = offset
+        offset += len(raw)
+        if setuptitle is None and "PrimitiveTest" in line:
+            row = next(_csv.reader([line]))
+            if row[0].strip() == "PrimitiveTest":
+                setuptitle = row[1].strip()
+        elif line.startswith("Dimension1"):
+            cut = int(line.split(",")[1])
+        elif var2_name is None and line.startswith("AnalysisSetup, Analysis.Setup.Vector.Graph.SetupInfo"):
+            var2_name = _re.split(r'[\t,]', line)[2].strip()
+            var2_values = line.split("\t")[1].split(",")
+        elif freqs is None and line.startswith("TestParameter, Measurement.Secondary.Frequency"):
+            freqs = [int(freq) for freq in line.split(",")[2:]]
+    return ECC133Header(setuptitle, cut, var2_name, var2_values, freqs, None, None)
+
+
+def _read_ECC133_data(file, header, fname, float_dtype=None):
+    # pandas continues from the data column header of the open file
+    if header.data_offset is None:
+        print(f"No Data -- {fname}")
+        file.seek(0)
+        return _pd.read_csv(file)
+    file.seek(header.data_offset)
+    if float_dtype is None:
+        return _pd.read_csv(file)
+
+    # compact: DataName as category, every data column parsed as float_dtype
+    names = next(_csv.reader([file.readline().decode("utf-8", errors="replace")]))
+    file.seek(header.data_offset)
+    dtypes = {name: float_dtype for name in names[1:]}
+    dtypes[names[0]] = "category"
+    try:
+        return _pd.read_csv(file, dtype=dtypes)
+    except ValueError:
+        # non-numeric entries: coerce only the columns that needed it
+        file.seek(header.data_offset)
+        df = _pd.read_csv(file, dtype={names[0]: "category"})
+        for name in df.columns[1:]:
+            if not _pd.api.types.is_numeric_dtype(df[name]):
+                df[name] = _pd.to_numeric(df[name], errors='coerce')
+        return df.astype({name: float_dtype for name in df.columns[1:]})
+
+
+def _repeat_var2(values, cut, float_dtype):
+    # var2 column of a compact frame: categorical built from codes, with
+    # numeric categories when the values are numbers
+    try:
+        values = _np.asarray(values, dtype=float_dtype)
+    except ValueError:
+        values = _np.asarray(values)
+    codes, categories = _pd.factorize(values)
+    return _pd.Categorical.from_codes(_np.repeat(codes, cut), categories=categories)
+
+
+def read_ECC133_csv(fpath, compact=False, float_dtype="float64"):
+    """
+    Read one ECC133 csv.
+
+    Parameters:
+        fpath (str): path of the csv file.
+        compact (bool): parse the data columns straight into float_dtype,
+            store DataName as categorical, var2 as categorical with numeric
+            categories (string categories if its values are not numbers)
+            and Freq as uint32.
+        float_dtype: dtype of the data columns in compact mode, e.g.
+            "float32" to halve the memory.
+
+    Returns:
+        pd.DataFrame, or None for an unknown measure type.
+    """
+    return _read_ECC133_file(fpath, float_dtype if compact else None)[1]
+
+
+def _read_ECC133_file(fpath, float_dtype=None):
+    # (header, DataFrame or None) of one ECC133 csv; float_dtype selects compact
     fname = _Path(fpath).stem
+    with open(fpath, 'rb') as file:
+        header = scan_ECC133_header(file)
+        measure_type = header.primitive_test
+        if measure_type is None:
+            print("Error: 'PrimitiveTest' not found in the file.")
 
-    match measure_type:
-        case "Id-Vd sweep":
-            start_index, cut = find_start_line(fpath)
-            df = _pd.read_csv(fpath, skiprows=start_index)
-            df.columns = df.columns.str.strip()
-            var2_name, var2_val = find_var2(fpath)
-            df[var2_name] = _np.repeat(var2_val, cut)
-        case "C-V Sweep":
-            start_index, cut = find_start_line(fpath)
-            df = _pd.read_csv(fpath, skiprows=start_index)
-            df.columns = df.columns.str.strip()
-            if "Freq" not in df.columns.values:
-                freq = find_freq(fpath)
-                df["Freq"] = _np.repeat(freq, cut)
-        case "2 term IV":
-            start_index, cut = find_start_line(fpath)
-            df = _pd.read_csv(fpath, skiprows=start_index)
-            df = df.apply(lambda x: _pd.to_numeric(x, errors='coerce'))
-            df.columns = df.columns.str.strip()
-        case "I/V Sweep":
-            start_index, cut = find_start_line(fpath)
-            df = _pd.read_csv(fpath, skiprows=start_index)
-            df = df.apply(lambda x: _pd.to_numeric(x, errors='coerce'))
-            df.columns = df.columns.str.strip()
-        case "Id-Vg sweep":
-            start_index, cut = find_start_line(fpath)
-            df = _pd.read_csv(fpath, skiprows=start_index)
-            df.columns = df.columns.str.strip()
-            var2_name, var2_val = find_var2(fpath)
-            df[var2_name] = _np.repeat(var2_val, cut)
-        case _:
-            print(f"{fname}\tUnknown measure type")
-            df = None
-    return df
+        match measure_type:
+            case "Id-Vd sweep" | "Id-Vg sweep":
+                df = _read_ECC133_data(file, header, fname, float_dtype)
+                df.columns = df.columns.str.strip()
+                if header.var2_name is None:
+                    print("Second Variable Not found!")
+                elif float_dtype is None:
+                    df[header.var2_name] = _np.repeat(header.var2_values, header.dimension1)
+                else:
+                    df[header.var2_name] = _repeat_var2(header.var2_values, header.dimension1, float_dtype)
+            case "C-V Sweep":
+                df = _read_ECC133_data(file, header, fname, float_dtype)
+                df.columns = df.columns.str.strip()
+                if "Freq" not in df.columns.values:
+                    freqs = header.freqs if float_dtype is None else _np.asarray(header.freqs, dtype=_np.uint32)
+                    df["Freq"] = _np.repeat(freqs, header.dimension1)
+            case "2 term IV" | "I/V Sweep":
+                df = _read_ECC133_data(file, header, fname, float_dtype)
+                if float_dtype is None:
+                    df = df.apply(lambda x: _pd.to_numeric(x, errors='coerce'))
+                df.columns = df.columns.str.strip()
+            case _:
+                print(f"{fname}\tUnknown measure type")
+                df = None
+    return header, df
 
 # Custom sorting function
 def extract_key(fpath):
@@ -118,6 +230,78 @@ def ECC_sort_extract_key(fpath):
     return (prefix, number_part)
 
 
+def _load_ECC133_job(fpath, float_dtype=None):
+    # Worker for load_ECC133_folder: messages are captured, not printed
+    import contextlib
+    import io
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            header, df = _read_ECC133_file(fpath, float_dtype)
+    except Exception as e:
+        return fpath, None, None, None, f"{type(e).__name__}: {e}"
+    return fpath, header.primitive_test, header.var2_name, df, messages.getvalue().strip()
+
+
+def load_ECC133_folder(folder, pattern="*.csv", workers=1, compact=False,
+                       float_dtype="float64"):
+    """
+    Read every ECC133 csv of a folder into one DataFrame per measure type.
+
+    Files are sniffed by their PrimitiveTest header, parsed (optionally in
+    a process pool) and concatenated in ECC_sort_extract_key order.
+
+    Parameters:
+        folder (str): folder holding the csv files.
+        pattern (str): glob pattern of the files.
+        workers (int): worker processes; 1 reads in this process, None uses
+            one process per CPU.
+        compact (bool), float_dtype: compact frames, as in read_ECC133_csv.
+
+    Returns:
+        (frames, failures, warnings): frames is {measure type: DataFrame}
+        with a categorical "fname" column and the var2 column as
+        categorical; failures is {file name: message} for files that could
+        not be read; warnings is {file name: message} for files that were
+        read but reported a problem (e.g. a missing second variable).
+    """
+    paths = sorted(_Path(folder).glob(pattern), key=ECC_sort_extract_key)
+    job = _partial(_load_ECC133_job, float_dtype=float_dtype if compact else None)
+    if workers == 1:
+        results = list(map(job, paths))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(job, paths))
+
+    grouped = {}
+    stems = {}
+    var2_names = {}
+    failures = {}
+    warnings = {}
+    for fpath, measure_type, var2_name, df, message in results:
+        if df is None:
+            failures[fpath.name] = message or "Unknown measure type"
+            continue
+        if message:
+            warnings[fpath.name] = message
+        grouped.setdefault(measure_type, []).append(df.assign(fname=fpath.stem))
+        stems.setdefault(measure_type, []).append(fpath.stem)
+        # only sweeps that added the column (C-V files may carry a SetupInfo line)
+        if var2_name is not None and var2_name in df:
+            var2_names.setdefault(measure_type, set()).add(var2_name)
+
+    frames = {}
+    for measure_type, dfs in grouped.items():
+        combined = _pd.concat(dfs, ignore_index=True)
+        categories = list(dict.fromkeys(stems[measure_type]))
+        combined["fname"] = _pd.Categorical(combined["fname"], categories=categories)
+        for name in var2_names.get(measure_type, ()):
+            combined[name] = combined[name].astype("category")
+        frames[measure_type] = combined
+    return frames, failures, warnings
+
+
 def average_forward_backward(df):
     """
     Averages forward and backward IV data from a DataFrame, ignoring non-numeric columns.
@@ -133,4 +317,119 @@ def average_forward_backward(df):
     half_length = len(numeric_df) // 2
     averaged_df = (numeric_df.iloc[:half_length].reset_index(drop=True) +
                    numeric_df.iloc[half_length:][::-1].reset_index(drop=True)) / 2
-    return averaged_df
\ No newline at end of file
+    return averaged_df
+
+def _sweep_blocks(df, group_cols=None):
+    """
+    Split stacked forward/backward sweeps into a (group, direction, points,
+    column) array.
+
+    Groups are consecutive runs of equal group-key values (missing keys,
+    e.g. a file without var2, compare equal); each run holds a forward
+    sweep followed by its backward sweep.
+    """
+    numeric_cols = list(df.select_dtypes(include='number').columns)
+    if group_cols is None:
+        group_cols = [c for c in df.columns if c not in numeric_cols]
+    numeric_cols = [c for c in numeric_cols if c not in group_cols]
+
+    n_rows = len(df)
+    if group_cols:
+        codes = _np.column_stack([_pd.factorize(df[c])[0] for c in group_cols])
+        starts = _np.flatnonzero(_np.r_[True, (codes[1:] != codes[:-1]).any(axis=1)])
+    else:
+        starts = _np.array([0])
+    if n_rows == 0:
+        raise ValueError("No rows to split into forward and backward sweeps.")
+    lengths = _np.diff(_np.r_[starts, n_rows])
+    bad = _np.flatnonzero((lengths != lengths[0]) | (lengths % 2 == 1))
+    if bad.size:
+        i = bad[0]
+        key = df[group_cols].iloc[starts[i]].to_dict() if group_cols else {}
+        raise ValueError(f"Group {key} has {lengths[i]} rows, the first group has "
+                         f"{lengths[0]}; every group needs the same, even number of "
+                         "rows (forward sweep followed by backward sweep).")
+
+    half = lengths[0] // 2
+    values = df[numeric_cols].to_numpy(dtype=float, copy=True).reshape(len(starts), 2, half, len(numeric_cols))
+    # backward sweeps reversed so points line up with the forward sweep
+    values[:, 1] = values[:, 1, ::-1]
+    keys = df[group_cols].iloc[starts].reset_index(drop=True)
+    return keys, numeric_cols, values
+
+
+def average_forward_backward_groups(df, group_cols=None):
+    """
+    Averages forward and backward sweeps of every group in one operation.
+
+    Works on stacked families such as Id-Vg files with several var2 values:
+    each consecutive run of equal group keys is a forward sweep followed by
+    its backward sweep.
+
+    Parameters:
+        df (pd.DataFrame): Stacked sweep data.
+        group_cols (list): Group key columns (default: all non-numeric columns).
+
+    Returns:
+        pd.DataFrame: Averaged numeric data with the group keys, one block
+        of points per group.
+    """
+    keys, numeric_cols, values = _sweep_blocks(df, group_cols)
+    n_groups, _, n_points, _ = values.shape
+    averaged = _pd.DataFrame(values.mean(axis=1).reshape(-1, len(numeric_cols)),
+                             columns=numeric_cols)
+    for col in keys.columns:
+        # keep the key dtypes (e.g. categorical fname and var2)
+        averaged[col] = keys[col].repeat(n_points).reset_index(drop=True)
+    return averaged
+
+
+def _take(a, i):
+    return _np.take_along_axis(a, i, axis=-1)[..., 0]
+
+
+def hysteresis(df, x_col, y_col, target=None, group_cols=None, log=True):
+    """
+    Hysteresis metrics of every forward/backward sweep group at once.
+
+    Parameters:
+        df (pd.DataFrame): Stacked sweep data (see average_forward_backward_groups).
+        x_col (str): Swept voltage column.
+        y_col (str): Current column.
+        target (float): Current at which the voltage shift is measured
+            (e.g. a constant-current threshold). None skips delta_V.
+        group_cols (list): Group key columns (default: all non-numeric columns).
+        log (bool): Interpolate the crossing in log10(|I|).
+
+    Returns:
+        pd.DataFrame: One row per group with the group keys, delta_V
+        (backward minus forward crossing voltage, NaN if a sweep never
+        reaches the target) and loop_area (|integral of I_fwd - I_bwd dV|).
+    """
+    keys, numeric_cols, values = _sweep_blocks(df, group_cols)
+    x = values[..., numeric_cols.index(x_col)]     # (group, direction, points)
+    y = values[..., numeric_cols.index(y_col)]
+
+    result = keys.copy()
+    if target is not None:
+        with _np.errstate(divide='ignore'):
+            level = _np.log10(_np.abs(y)) if log else y
+            goal = _np.log10(abs(target)) if log else target
+        above = level >= goal
+        # first point where the sweep crosses the target level
+        crossed = above[..., 1:] != above[..., :-1]
+        found = crossed.any(axis=-1)
+        i = _np.argmax(crossed, axis=-1)[..., None]
+        l0 = _take(level, i)
+        l1 = _take(level, i + 1)
+        x0 = _take(x, i)
+        x1 = _take(x, i + 1)
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            crossing = x0 + (goal - l0) * (x1 - x0) / (l1 - l0)
+        crossing = _np.where(found, crossing, _np.nan)
+        result["delta_V"] = crossing[:, 1] - crossing[:, 0]
+
+    gap = y[:, 0] - y[:, 1]
+    xf = x[:, 0]
+    result["loop_area"] = _np.abs((0.5 * (gap[:, 1:] + gap[:, :-1]) * _np.diff(xf, axis=-1)).sum(axis=-1))
+    return result
@@ -9,10 +9,15 @@ Created on Fri Apr 19 09:36:42 2024
 import numpy as _np
 import pandas as _pd
 import os as _os
+import json as _json
+import mmap as _mmap
+import re as _re
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor, as_completed as _as_completed
 import matplotlib.pyplot as _plt
+from collections import namedtuple as _namedtuple
 
 def read_mdm(filename):
-    data = []
+    rows = []
     headers = []
     start_reading = False
     with open(filename, 'r') as file:
@@ -30,33 +35,194 @@ def read_mdm(filename):
                 start_reading = True
                 continue
             if start_reading:
-                parts = line.split()
-                # Convert strings to appropriate types (float)
-                float_parts = [float(x) for x in parts]
-                data.append(float_parts)
+                rows.append(line)
 
-    # Convert list to Numpy array
+    # Convert all rows at once; irregular rows are converted one by one
+    values = _np.array(" ".join(rows).split(), dtype=float)
+    if rows and values.size == len(rows) * len(headers):
+        data = values.reshape(len(rows), len(headers))
+    else:
+        data = [[float(x) for x in line.split()] for line in rows]
     return _pd.DataFrame(data, columns=headers)
 
-def load_mdm_from_folder(folder_path):
-    mdm_files = []
-    data = {}
+# Consolidated folder cache; bump when the stored layout changes
+_MDM_FOLDER_CACHE_VERSION = 1
+_MDM_FOLDER_CACHE = ".ttlab_mdm_cache.feather"
+
+def _load_mdm_folder_cache(cache_file):
+    # {name: (stat, columns, DataFrame)} from a consolidated cache, or {}
+    try:
+        with open(cache_file + ".json", 'r') as file:
+            manifest = _json.load(file)
+        if manifest.get("version") != _MDM_FOLDER_CACHE_VERSION:
+            return {}
+        table = _pd.read_feather(cache_file)
+    except (OSError, ValueError):
+        return {}
+    cached = {}
+    groups = dict(iter(table.groupby("file", observed=True, sort=False))) if len(table) else {}
+    for name, entry in manifest["files"].items():
+        group = groups.get(name, table.iloc[:0])
+        df = group[entry["columns"]].reset_index(drop=True)
+        cached[name] = ((entry["mtime_ns"], entry["size"]), entry["columns"], df)
+    return cached
+
+def _save_mdm_folder_cache(cache_file, frames, stats):
+    files = list(frames)
+    table = _pd.concat([frames[name].assign(file=name) for name in files], ignore_index=True)
+    table["file"] = _pd.Categorical(table["file"], categories=files)
+    table.to_feather(cache_file)
+    manifest = {"version": _MDM_FOLDER_CACHE_VERSION,
+                "files": {name: {"mtime_ns": stats[name][0], "size": stats[name][1],
+                                 "columns": list(frames[name].columns)}
+                          for name in files}}
+    with open(cache_file + ".json", 'w') as file:
+        _json.dump(manifest, file)
+
+def load_mdm_from_folder(folder_path, workers=1, cache=False, progress=False):
+    """
+    Read every .mdm file of a folder with read_mdm.
+
+    Args:
+        folder_path (str): folder holding the .mdm files.
+        workers (int): worker processes; 1 reads in this process, None uses
+            one process per CPU.
+        cache (bool or str): keep a consolidated Feather cache of the parsed
+            files (needs pyarrow, the "fast" extra; without it the cache
+            raises ImportError). True stores it in the folder, a path stores
+            it there. Files whose mtime and size are unchanged are taken from
+            the cache; only new or changed files are parsed.
+        progress (bool or callable): print progress, or call
+            progress(done, total, filename) after each parsed file.
+
+    Returns:
+        dict of {file name without extension: DataFrame}.
+    """
+    filenames = sorted(f for f in _os.listdir(folder_path) if f.endswith(".mdm"))
+    stats = {}
+    for filename in filenames:
+        stat = _os.stat(_os.path.join(folder_path, filename))
+        stats[filename] = (stat.st_mtime_ns, stat.st_size)
 
-    for filename in _os.listdir(folder_path):
-        if filename.endswith(".mdm"):
-            full_path = _os.path.join(folder_path, filename)
-            base_name = filename.split(".")[0]
-            data[base_name] = read_mdm(full_path)
+    cache_file = None
+    cached = {}
+    if cache:
+        cache_file = _os.path.join(folder_path, _MDM_FOLDER_CACHE) if cache is True else _os.fspath(cache)
+        cached = _load_mdm_folder_cache(cache_file)
+
+    frames = {name: entry[2] for name, entry in cached.items()
+              if name in stats and entry[0] == tuple(stats[name])}
+    todo = [f for f in filenames if f not in frames]
+
+    if progress is True:
+        def progress(done, total, filename):
+            print(f"\r[{done}/{total}] {filename}", end="\n" if done == total else "")
+    paths = [_os.path.join(folder_path, filename) for filename in todo]
+    if workers == 1:
+        for i, (filename, full_path) in enumerate(zip(todo, paths), 1):
+            frames[filename] = read_mdm(full_path)
+            if progress:
+                progress(i, len(todo), filename)
+    elif todo:
+        with _ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(read_mdm, full_path): filename
+                       for filename, full_path in zip(todo, paths)}
+            for i, future in enumerate(_as_completed(futures), 1):
+                frames[futures[future]] = future.result()
+                if progress:
+                    progress(i, len(todo), futures[future])
+
+    if cache_file is not None and (todo or set(cached) != set(filenames)):
+        _save_mdm_folder_cache(cache_file, {f: frames[f] for f in filenames}, stats)
+
+    data = {}
+    for filename in filenames:
+        base_name = filename.split(".")[0]
+        data[base_name] = frames[filename]
     return data
 
 
 
-def plot_selected_data(data_dict, selected_keys, x_axis, y_axis,legend=None, Abs=False, xscal=1, yscal=1):
+def _minmax_decimate(x, y, n_out):
+    # Indices of the min and max of y in equal-count buckets, plus the end
+    # points, which keeps the visual envelope of the trace
+    n = len(y)
+    size = -(-n // max(1, (n_out - 2) // 2))
+    n_buckets = -(-n // size)
+    pad = n_buckets * size - n
+    low = _np.concatenate([_np.where(_np.isnan(y), _np.inf, y), _np.full(pad, _np.inf)])
+    high = _np.concatenate([_np.where(_np.isnan(y), -_np.inf, y), _np.full(pad, -_np.inf)])
+    base = _np.arange(n_buckets) * size
+    idx = _np.concatenate([base + low.reshape(n_buckets, size).argmin(axis=1),
+                           base + high.reshape(n_buckets, size).argmax(axis=1),
+                           [0, n - 1]])
+    return _np.unique(_np.clip(idx, 0, n - 1))
+
+
+def _lttb_decimate(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: first and last points plus, per
+    # bucket, the point forming the largest triangle with the previously
+    # kept point and the mean of the next bucket
+    n = len(y)
+    if n_out < 3:
+        return _np.array([0, n - 1])
+    edges = (_np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    # bucket means from cumulative sums; the last "next bucket" is the end point
+    cx = _np.concatenate([[0.0], _np.cumsum(x)])
+    cy = _np.concatenate([[0.0], _np.cumsum(y)])
+    counts = _np.diff(edges)
+    mean_x = _np.append((cx[edges[1:]] - cx[edges[:-1]]) / counts, x[-1])
+    mean_y = _np.append((cy[edges[1:]] - cy[edges[:-1]]) / counts, y[-1])
+
+    idx = _np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = _np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+                       - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(_np.nanargmax(area)) if _np.isfinite(area).any() else lo
+        idx[i + 1] = a
+    return idx
+
+
+def decimate(x, y, max_points, method="minmax"):
+    """
+    Reduce a trace to about max_points points while keeping its shape.
+
+    Args:
+        x, y (np.ndarray): trace data.
+        max_points (int): point budget of the trace.
+        method (str): "minmax" keeps the min and max of each bucket
+            (envelope, safe for noisy data); "lttb" uses
+            Largest-Triangle-Three-Buckets.
+
+    Returns:
+        (x, y) decimated arrays.
+    """
+    x = _np.asarray(x, dtype=float)
+    y = _np.asarray(y, dtype=float)
+    if max_points is None or len(y) <= max_points:
+        return x, y
+    if method == "minmax":
+        idx = _minmax_decimate(x, y, max_points)
+    elif method == "lttb":
+        idx = _lttb_decimate(x, y, max_points)
+    else:
+        raise ValueError("method must be 'minmax' or 'lttb'")
+    return x[idx], y[idx]
+
+
+def plot_selected_data(data_dict, selected_keys, x_axis, y_axis,legend=None, Abs=False, xscal=1, yscal=1,
+                       max_points=None, method="minmax"):
     # Plot only the selected datasets
     # Input dictionary,select keys, and xy axis DataFrame column name
     """
     selected_keys needs to be [list]
     x_axis, y_axis is DataFrame column name
+    max_points limits the points drawn per trace (None draws all of them),
+    method is the downsampling method, "minmax" or "lttb" (see decimate)
     """
     fig, ax = _plt.subplots(figsize=(8, 5))
     valid_legend = []
@@ -68,10 +234,13 @@ def plot_selected_data(data_dict, selected_keys, x_axis, y_axis,legend=None, Abs
             if x_axis not in df.columns or y_axis not in df.columns:
                 print(f"Columns {x_axis} or {y_axis} not found in DataFrame associated with {key}.")
                 continue  # Skip this key and move to the next
+            x = df[x_axis].to_numpy(dtype=float)
+            y = df[y_axis].to_numpy(dtype=float)
             if Abs:
-                ax.plot(abs(df[x_axis])*xscal, abs(df[y_axis])*yscal, label=key)
-            else:
-                ax.plot(df[x_axis]*xscal, df[y_axis]*yscal, label=key)
+                x = _np.abs(x)
+                y = _np.abs(y)
+            x, y = decimate(x * xscal, y * yscal, max_points, method)
+            ax.plot(x, y, label=key)
             if legend != None:
                 valid_legend.append(legend[counter])
         else:
@@ -128,64 +297,322 @@ def read_mdm_multiple(filename, var):
     return data_dict
 
 
+def _mdm_value(text):
+    # ICCAP_VAR values are numeric, but keep anything else as text
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
 def mdm2df(fpath) -> _pd.DataFrame:
     """
     Converts MDM formatted data to a pandas DataFrame.
 
+    The file is read in a single pass; each data block is converted to a
+    float array in bulk and the DataFrame is built once at the end.
+
     Args:
         fpath (str): The file path of the MDM file to be parsed.
 
     Returns:
-        A DataFrame containing the structured data from the MDM file.
+        A long-format DataFrame with one row per data point, the data
+        columns and the block's ICCAP_VAR values as float columns.
 
     Examples:
         Using this function to extract data
 
-        >>> mdm2df("file_directory_path.mdm")
+        >>> data = mdm2df("file_directory_path.mdm")
         >>> print(data.head())
     """
 
+    columns = []      # header columns first, then new ones in order seen
+    blocks = []       # (data column names, data lines, ICCAP_VAR values)
     mode = None
     with open(fpath, 'r') as file:
         for line in file:
             line = line.strip()
             if line.startswith("BEGIN_HEADER"):
-                Columns = []
                 mode = "Header"
                 continue
             elif line.startswith("END_HEADER"):
-                data = _pd.DataFrame(columns=Columns)
                 mode = None
                 continue
             elif line.startswith("BEGIN_DB"):
                 mode = "DB"
-                ICCAP_var = []
+                iccap_var = {}
                 continue
             elif line.startswith("END_DB"):
                 mode = None
                 continue
             elif line.startswith("#"):
-                ICCAP_var = _pd.DataFrame(ICCAP_var)
-                ICCAP_var_columns = ICCAP_var.iloc[:, 0].values
-                ICCAP_var_values = ICCAP_var.iloc[:, 1].values
-                ICCAP_var = _pd.DataFrame([ICCAP_var_values], columns=ICCAP_var_columns)
-
-                data_column_name = line[1:].split()
+                rows = []
+                blocks.append((line[1:].split(), rows, iccap_var))
                 mode = "Data"
                 continue
 
+            if not line:
+                continue
             match mode:
                 case "Header":
                     if "ICCAP" in line:
                         continue
-                    Columns.append(line.split()[0])
+                    columns.append(line.split()[0])
                 case "DB":
                     if line.startswith("ICCAP_VAR"):
-                        ICCAP_var.append(line.split()[-2:])
-                        continue
+                        name, value = line.split()[-2:]
+                        iccap_var[name] = _mdm_value(value)
                 case "Data":
-                    temp = _pd.DataFrame([line.split()], columns=data_column_name)
-                    for c_name in ICCAP_var_columns:
-                        temp[c_name] = ICCAP_var[c_name]
-                    data = _pd.concat([data, temp], ignore_index=True)
-    return data
\ No newline at end of file
+                    rows.append(line)
+
+    for names, _, iccap_var in blocks:
+        for name in list(names) + list(iccap_var):
+            if name not in columns:
+                columns.append(name)
+
+    parts = {name: [] for name in columns}
+    for names, rows, iccap_var in blocks:
+        n = len(rows)
+        if rows:
+            values = _np.array(" ".join(rows).split(), dtype=float).reshape(n, -1)
+        else:
+            values = _np.empty((0, len(names)))
+        block = dict(zip(names, values.T))
+        # ICCAP_VAR values override data columns of the same name
+        for name, value in iccap_var.items():
+            block[name] = _np.full(n, value, dtype=float if isinstance(value, float) else object)
+        for name in columns:
+            parts[name].append(block.get(name, _np.full(n, _np.nan)))
+
+    data = {name: _np.concatenate(chunks) if chunks else _np.empty(0)
+            for name, chunks in parts.items()}
+    return _pd.DataFrame(data, columns=columns)
+
+
+# Sidecar index format version; bump when the stored layout changes
+_MDM_INDEX_VERSION = 1
+
+def _parse_mdm_block(text):
+    """Data column names, float rows and ICCAP_VAR values of one DB block."""
+    names = []
+    rows = []
+    iccap_var = {}
+    in_data = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("ICCAP_VAR"):
+            name, value = line.split()[-2:]
+            iccap_var[name] = _mdm_value(value)
+        elif line.startswith("#"):
+            names = line[1:].split()
+            in_data = True
+        elif in_data:
+            rows.append(line)
+    if rows:
+        values = _np.array(" ".join(rows).split(), dtype=float).reshape(len(rows), -1)
+    else:
+        values = _np.empty((0, len(names)))
+    return names, values, iccap_var
+
+
+class MdmIndex:
+    """
+    Byte-offset index of the BEGIN_DB/END_DB blocks of an .mdm file.
+
+    Built once by scanning a memory map of the file for block markers;
+    a block is then read by seeking to its offsets, so per-block lookups
+    do not depend on the file size. Use index_mdm() to build or load one.
+
+    Attributes:
+        fpath: the indexed .mdm file.
+        blocks: list of (start, end, {ICCAP_VAR name: value}) per block.
+    """
+
+    def __init__(self, fpath, blocks):
+        self.fpath = _os.fspath(fpath)
+        self.blocks = [(int(start), int(end), dict(var)) for start, end, var in blocks]
+        self._lookup = {}
+        for i, (_, _, var) in enumerate(self.blocks):
+            self._lookup.setdefault(self._key(var), i)
+
+    @staticmethod
+    def _key(var):
+        return tuple(sorted(var.items()))
+
+    @classmethod
+    def build(cls, fpath):
+        """Scan fpath for block markers and their ICCAP_VAR values."""
+        blocks = []
+        with open(fpath, 'rb') as file:
+            if _os.fstat(file.fileno()).st_size == 0:
+                return cls(fpath, blocks)
+            with _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ) as mm:
+                for begin in _re.finditer(rb"BEGIN_DB[^\n]*\n", mm):
+                    start = begin.end()
+                    end = mm.find(b"END_DB", start)
+                    if end == -1:
+                        end = len(mm)
+                    header_end = mm.find(b"#", start, end)
+                    head = mm[start:end if header_end == -1 else header_end]
+                    var = {name.decode(): _mdm_value(value.decode())
+                           for name, value in _re.findall(rb"ICCAP_VAR\s+(\S+)\s+(\S+)", head)}
+                    blocks.append((start, end, var))
+        return cls(fpath, blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def variables(self) -> _pd.DataFrame:
+        """ICCAP_VAR values of every block, one row per block."""
+        return _pd.DataFrame([var for _, _, var in self.blocks])
+
+    def find(self, **var) -> int:
+        """Position of the first block whose ICCAP_VAR values match var."""
+        var = {name: _mdm_value(str(value)) for name, value in var.items()}
+        if self.blocks and set(var) == set(self.blocks[0][2]):
+            i = self._lookup.get(self._key(var))
+            if i is not None:
+                return i
+        for i, (_, _, block_var) in enumerate(self.blocks):
+            if all(block_var.get(name) == value for name, value in var.items()):
+                return i
+        raise KeyError(f"No block with {var} in {self.fpath}")
+
+    def read_block(self, i) -> _pd.DataFrame:
+        """Parse only block i into a float DataFrame of its data columns."""
+        start, end, _ = self.blocks[i]
+        with open(self.fpath, 'rb') as file:
+            file.seek(start)
+            text = file.read(end - start).decode()
+        names, values, _ = _parse_mdm_block(text)
+        return _pd.DataFrame(values, columns=names)
+
+    def get_block(self, **var) -> _pd.DataFrame:
+        """
+        Data of the block with the given ICCAP_VAR values.
+
+        Examples:
+            >>> index = index_mdm("Id_Vd.mdm")
+            >>> df = index.get_block(Vgate=1.2)
+        """
+        return self.read_block(self.find(**var))
+
+    def save(self, sidecar):
+        """Write the index as JSON, tagged with the file's mtime and size."""
+        stat = _os.stat(self.fpath)
+        with open(sidecar, 'w') as file:
+            _json.dump({"version": _MDM_INDEX_VERSION,
+                       "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                       "blocks": self.blocks}, file)
+
+    @classmethod
+    def load(cls, fpath, sidecar):
+        """Index stored in sidecar, or None if missing or out of date."""
+        try:
+            with open(sidecar, 'r') as file:
+                stored = _json.load(file)
+        except (OSError, ValueError):
+            return None
+        stat = _os.stat(fpath)
+        if (stored.get("version") != _MDM_INDEX_VERSION
+                or stored.get("mtime_ns") != stat.st_mtime_ns
+                or stored.get("size") != stat.st_size):
+            return None
+        return cls(fpath, stored["blocks"])
+
+
+def index_mdm(fpath, sidecar=False) -> MdmIndex:
+    """
+    Build (or load) the block index of an .mdm file.
+
+    Args:
+        fpath (str): The .mdm file.
+        sidecar (bool or str): False keeps the index in memory only; True
+            stores it as "<fpath>.idx.json" next to the file, a path stores
+            it there. A stored index is reused while the file is unchanged.
+
+    Returns:
+        MdmIndex with get_block(**ICCAP_VAR values) lookups.
+    """
+    if not sidecar:
+        return MdmIndex.build(fpath)
+    if sidecar is True:
+        sidecar = _os.fspath(fpath) + ".idx.json"
+    index = MdmIndex.load(fpath, sidecar)
+    if index is None:
+        index = MdmIndex.build(fpath)
+        index.save(sidecar)
+    return index
+
+
+MdmArray = _namedtuple("MdmArray", ["values", "coords", "columns"])
+MdmArray.__doc__ = """
+Dense multi-sweep MDM data.
+
+values: float64 array shaped (outer sweeps..., points, columns), NaN where
+    a sweep combination is missing or a curve is shorter than the longest.
+coords: {ICCAP_VAR name: values} for the outer axes, in axis order.
+columns: data column names of the last axis.
+"""
+
+
+def read_mdm_array(fpath) -> MdmArray:
+    """
+    Read an .mdm file with any number of nested ICCAP_VAR sweeps into one
+    contiguous array, for vectorized math across the whole family of curves.
+
+    Outer axes follow the order of the ICCAP_VAR lines in a block, and the
+    values along each axis keep the order in which they first appear.
+
+    Args:
+        fpath (str): The .mdm file.
+
+    Returns:
+        MdmArray(values, coords, columns).
+
+    Examples:
+        >>> values, coords, columns = read_mdm_array("Id_Vd.mdm")
+        >>> Id = values[..., columns.index("Id")]   # (Vg, points)
+    """
+    index = MdmIndex.build(fpath)
+    with open(fpath, 'rb') as file:
+        content = file.read()
+
+    columns = None
+    curves = []
+    var_names = []
+    for start, end, var in index.blocks:
+        names, values, _ = _parse_mdm_block(content[start:end].decode())
+        if columns is None:
+            columns = names
+        elif names != columns:
+            raise ValueError(f"Data columns differ between blocks: {columns} vs {names}")
+        curves.append(values)
+        for name in var:
+            if name not in var_names:
+                var_names.append(name)
+    if columns is None:
+        return MdmArray(_np.empty((0, 0)), {}, [])
+
+    # position of every block along each outer axis
+    coords = {}
+    positions = []
+    for name in var_names:
+        axis_values = [var.get(name, _np.nan) for _, _, var in index.blocks]
+        uniq = list(dict.fromkeys(axis_values))
+        lookup = {value: i for i, value in enumerate(uniq)}
+        coords[name] = _np.array(uniq)
+        positions.append([lookup[value] for value in axis_values])
+
+    shape = tuple(len(v) for v in coords.values())
+    n_points = max(len(curve) for curve in curves)
+    out = _np.full((int(_np.prod(shape)), n_points, len(columns)), _np.nan)
+    flat = _np.ravel_multi_index(positions, shape) if shape else _np.zeros(len(curves), dtype=int)
+    if all(len(curve) == n_points for curve in curves):
+        out[flat] = _np.stack(curves)
+    else:
+        for i, curve in zip(flat, curves):
+            out[i, :len(curve)] = curve
+    return MdmArray(out.reshape(shape + (n_points, len(columns))), coords, list(columns))
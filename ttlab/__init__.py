@@ -3,6 +3,7 @@ from . import ERC224
 from . import ECC133
 from . import silvacoVD
 from . import characterization
+from . import extraction
 from . import semi_physics
 
 __version__ = "0.1.0"
@@ -17,5 +18,6 @@ __all__ = [
     "ECC133",
     "silvacoVD",
     "characterization",
+    "extraction",
     "semi_physics",
 ]
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+On-disk cache for parsed measurement / simulation files.
+
+Parsed arrays are stored as .npz files keyed on the source path, its
+modification time and size, and the parser version, so an edited or
+rewritten source file is simply a cache miss. The cache directory is kept
+under a size cap by evicting the least recently used entries.
+"""
+
+import hashlib as _hashlib
+import os as _os
+import zipfile as _zipfile
+from pathlib import Path as _Path
+
+import numpy as _np
+import platformdirs as _platformdirs
+
+
+class ParseCache:
+    """
+    Least-recently-used .npz cache of parsed file contents.
+
+    Args:
+        cache_dir: directory holding the cache files
+            (default: the user cache directory of ttlab).
+        max_bytes: size cap of the cache directory; the least recently
+            used entries are removed once it is exceeded.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=1 << 30):
+        if cache_dir is None:
+            cache_dir = _platformdirs.user_cache_dir("ttlab")
+        self.cache_dir = _Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(self, source, kind, version):
+        """Cache key of a source file: path, mtime, size and parser version."""
+        source = _Path(source).resolve()
+        stat = source.stat()
+        token = f"{source}|{stat.st_mtime_ns}|{stat.st_size}|{kind}|{version}"
+        return f"{kind}-{_hashlib.sha1(token.encode()).hexdigest()}"
+
+    def _entry(self, source, kind, version):
+        return self.cache_dir / f"{self.key(source, kind, version)}.npz"
+
+    def load(self, source, kind, version):
+        """
+        Arrays cached for a source file.
+
+        Returns:
+            dict of arrays, or None on a miss (or an unreadable entry).
+        """
+        entry = self._entry(source, kind, version)
+        if not entry.exists():
+            return None
+        try:
+            with _np.load(entry, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except (OSError, ValueError, EOFError, KeyError, _zipfile.BadZipFile):
+            # truncated or corrupt entry (e.g. an interrupted write)
+            entry.unlink(missing_ok=True)
+            return None
+        # mark as recently used
+        _os.utime(entry)
+        return arrays
+
+    def store(self, source, kind, version, arrays):
+        """Write the arrays of a source file, then enforce the size cap."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(source, kind, version)
+        tmp = entry.with_name(entry.name + f".{_os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            _np.savez(f, **arrays)
+        _os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until under max_bytes."""
+        entries = []
+        for path in self.cache_dir.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Remove every cache entry."""
+        for path in self.cache_dir.glob("*.npz"):
+            path.unlink(missing_ok=True)
+
+
+def resolve_cache(cache):
+    """
+    Normalise a `cache` argument: None/False (off), True (default cache),
+    a directory path, or a ParseCache instance.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ParseCache()
+    if isinstance(cache, ParseCache):
+        return cache
+    return ParseCache(cache)
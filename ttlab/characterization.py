@@ -3,7 +3,11 @@ Semiconductor Characterization formula
 """
 
 import numpy as _np
+import pandas as _pd
 import matplotlib.pyplot as _plt
+from collections import namedtuple as _namedtuple
+
+from .extraction import stack_curves as _stack_curves
 
 def calculate_ideality_factor(V, I, V_range, temperature=300, plot=False):
     """
@@ -23,15 +27,14 @@ def calculate_ideality_factor(V, I, V_range, temperature=300, plot=False):
     q = 1.602e-19  # Elementary charge (C)
     k = 1.38e-23   # Boltzmann constant (J/K)
     
-    # Filter data within the specified voltage range
-    mask = (V >= V_range[0]) & (V <= V_range[1])
+    # Filter data within the specified voltage range, keeping only positive
+    # currents (for the log) so that V and I stay paired
+    V = _np.asarray(V)
+    I = _np.asarray(I)
+    mask = (V >= V_range[0]) & (V <= V_range[1]) & (I > 0)
     V_filtered = V[mask]
     I_filtered = I[mask]
     
-    # Ensure no zero or negative currents for log calculation
-    I_filtered = I_filtered[I_filtered > 0]
-    V_filtered = V_filtered[:len(I_filtered)]
-    
     # Calculate ln(I)
     ln_I = _np.log(I_filtered)
     
@@ -54,4 +57,277 @@ def calculate_ideality_factor(V, I, V_range, temperature=300, plot=False):
         _plt.tight_layout()
         _plt.show()
     
-    return n
\ No newline at end of file
+    return n
+
+IdealityFit = _namedtuple("IdealityFit", ["n", "Is", "r2", "V_start", "V_stop"])
+IdealityFit.__doc__ = """
+Per-device result of batch_ideality_factor (arrays of shape (devices,)).
+
+n: ideality factor.
+Is: saturation current (A), exp of the ln(I) intercept at V = 0.
+r2: coefficient of determination of the ln(I) vs V fit.
+V_start, V_stop: voltage span of the fitted points.
+Devices without a valid fit are NaN.
+"""
+
+
+def _window_sums(x, axis_len, window):
+    # sums over every run of `window` consecutive points along the last axis
+    cs = _np.zeros(x.shape[:-1] + (axis_len + 1,))
+    _np.cumsum(x, axis=-1, out=cs[..., 1:])
+    return cs[..., window:] - cs[..., :-window]
+
+
+def batch_ideality_factor(V, I, V_range=None, window=None, temperature=300, min_points=3):
+    """
+    Ideality factor of many diodes at once.
+
+    ln(I) vs V is fitted by masked least squares in closed form for all
+    devices together. With `window`, every run of `window` consecutive
+    points is fitted (via cumulative sums) and the run with the best R^2
+    and a positive slope is kept per device, replacing a hand-picked
+    V_range.
+
+    Parameters:
+        V (array-like): Voltage (V), shape (points,) shared by all devices
+            or (devices, points).
+        I (array-like): Current (A), shape (devices, points). NaN pads
+            ragged sweeps; non-positive currents are ignored.
+        V_range (tuple): Voltage range (min_V, max_V) of usable points.
+        window (int): Points per sliding fit window; None fits every
+            usable point.
+        temperature (float): Temperature in Kelvin.
+        min_points (int): Minimum number of usable points in a fit.
+
+    Returns:
+        IdealityFit: n, Is, r2, V_start, V_stop per device.
+    """
+    q = 1.602e-19  # Elementary charge (C)
+    k = 1.38e-23   # Boltzmann constant (J/K)
+
+    I = _np.atleast_2d(_np.asarray(I, dtype=float))
+    V = _np.broadcast_to(_np.asarray(V, dtype=float), I.shape)
+    with _np.errstate(invalid='ignore'):
+        mask = _np.isfinite(V) & (I > 0)
+        if V_range is not None:
+            mask &= (V >= V_range[0]) & (V <= V_range[1])
+    w = mask.astype(float)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        lnI = _np.log(_np.where(mask, I, 1.0))
+        # centre each device so the running sums do not cancel
+        count = w.sum(axis=-1, keepdims=True)
+        x0 = _np.where(mask, V, 0.0).sum(axis=-1, keepdims=True) / count
+        y0 = _np.where(mask, lnI, 0.0).sum(axis=-1, keepdims=True) / count
+    x = _np.where(mask, V - x0, 0.0)
+    y = _np.where(mask, lnI - y0, 0.0)
+
+    n_points = I.shape[-1]
+    if window is None:
+        window = n_points
+    if not min_points <= window <= n_points:
+        raise ValueError(f"window must be between min_points and {n_points}")
+
+    # weighted moments of every candidate window, shape (devices, windows)
+    sw, sx, sy, sxx, sxy, syy = (_window_sums(a, n_points, window)
+                                 for a in (w, x, y, x * x, x * y, y * y))
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        vxx = sxx - sx * sx / sw
+        vxy = sxy - sx * sy / sw
+        vyy = syy - sy * sy / sw
+        slope = vxy / vxx
+        intercept = y0 + (sy - slope * sx) / sw - slope * x0
+        r2 = vxy * vxy / (vxx * vyy)
+    valid = (sw >= min_points) & (slope > 0) & _np.isfinite(r2)
+    score = _np.where(valid, r2, -_np.inf)
+    best = _np.argmax(score, axis=-1)
+    rows = _np.arange(I.shape[0])
+    ok = valid[rows, best]
+
+    def pick(a):
+        return _np.where(ok, a[rows, best], _np.nan)
+
+    slope = pick(slope)
+    # voltage span of the masked points inside the chosen window
+    cols = best[:, None] + _np.arange(window)
+    Vw = _np.where(mask[rows[:, None], cols], V[rows[:, None], cols], _np.nan)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        n = q / (slope * k * temperature)
+    with _np.errstate(all='ignore'):
+        V_start = _np.where(ok, _np.nanmin(_np.where(ok[:, None], Vw, 0.0), axis=-1), _np.nan)
+        V_stop = _np.where(ok, _np.nanmax(_np.where(ok[:, None], Vw, 0.0), axis=-1), _np.nan)
+    return IdealityFit(n, _np.exp(pick(intercept)), pick(r2), V_start, V_stop)
+
+
+def _local_fit(x, y, window):
+    """
+    Least-squares line through the `window` points centred on every point
+    of stacked sweeps (smoothed derivative); NaN where the window does not fit.
+
+    Returns:
+        (slope, intercept, r2), each of the shape of y.
+    """
+    y = _np.asarray(y, dtype=float)
+    x = _np.broadcast_to(_np.asarray(x, dtype=float), y.shape)
+    mask = _np.isfinite(x) & _np.isfinite(y)
+    w = mask.astype(float)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        count = w.sum(axis=-1, keepdims=True)
+        x0 = _np.where(mask, x, 0.0).sum(axis=-1, keepdims=True) / count
+        y0 = _np.where(mask, y, 0.0).sum(axis=-1, keepdims=True) / count
+    xc = _np.where(mask, x - x0, 0.0)
+    yc = _np.where(mask, y - y0, 0.0)
+
+    n_points = y.shape[-1]
+    window = min(window, n_points)
+    sw, sx, sy, sxx, sxy, syy = (_window_sums(a, n_points, window)
+                                 for a in (w, xc, yc, xc * xc, xc * yc, yc * yc))
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        vxx = sxx - sx * sx / sw
+        vxy = sxy - sx * sy / sw
+        vyy = syy - sy * sy / sw
+        slope = _np.where(sw >= 2, vxy / vxx, _np.nan)
+        intercept = y0 + (sy - slope * sx) / sw - slope * x0
+        r2 = vxy * vxy / (vxx * vyy)
+
+    # window k covers points k .. k+window-1; align it to its centre point
+    shape = y.shape[:-1] + (n_points,)
+    lead = (window - 1) // 2
+    out = []
+    for a in (slope, intercept, r2):
+        full = _np.full(shape, _np.nan)
+        full[..., lead:lead + a.shape[-1]] = a
+        out.append(_np.where(mask, full, _np.nan))
+    return tuple(out)
+
+
+CVProfile = _namedtuple("CVProfile", [
+    "inv_C2", "depth", "doping", "Cox", "N", "Vfb", "V_intercept"])
+CVProfile.__doc__ = """
+Result of cv_analysis. Point-wise arrays have the shape of C; per-curve
+values the leading shape.
+
+inv_C2: 1/C^2 (cm^4/F^2), C per unit area.
+depth: depletion depth (cm) at every bias point.
+doping: doping profile N(depth) (cm^-3) at every bias point.
+Cox: oxide capacitance per area (F/cm^2), the maximum C (MOS only).
+N: median doping of the depletion region (cm^-3).
+Vfb: flat-band voltage (V) from the flat-band capacitance (MOS only).
+V_intercept: voltage axis intercept of the most linear 1/C^2 segment
+    (built-in potential of a Schottky / pn junction).
+"""
+
+
+def cv_analysis(V, C, area, eps_r=11.7, mos=True, window=5, temperature=300):
+    """
+    Doping profile, depletion depth, oxide capacitance and flat-band voltage
+    of every stacked C-V sweep at once.
+
+    Stack files and frequencies first, e.g.
+    V, C, levels = extraction.stack_curves(df, "V", "C", ["fname", "Freq"]).
+    d(1/C^2)/dV is a local least-squares slope over `window` points.
+
+    Parameters:
+        V (array-like): Gate / bias voltage (V), shape (..., points) or (points,).
+        C (array-like): Capacitance (F), shape (..., points); NaN pads.
+        area (float): Device area (cm^2).
+        eps_r (float): Relative permittivity of the semiconductor.
+        mos (bool): MOS capacitor: the maximum C is taken as Cox and is
+            removed in series from the depletion depth; flat band is
+            extracted. False for Schottky / pn junctions.
+        window (int): Points of the smoothing derivative.
+        temperature (float): Temperature in Kelvin.
+
+    Returns:
+        CVProfile
+    """
+    q = 1.602e-19       # Elementary charge (C)
+    k = 1.38e-23        # Boltzmann constant (J/K)
+    eps0 = 8.854e-14    # Vacuum permittivity (F/cm)
+    eps_s = eps_r * eps0
+
+    C = _np.asarray(C, dtype=float) / area
+    V = _np.broadcast_to(_np.asarray(V, dtype=float), C.shape)
+    valid = _np.isfinite(V) & _np.isfinite(C) & (C > 0)
+    C = _np.where(valid, C, _np.nan)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        inv_C2 = 1 / C ** 2
+    slope, intercept, r2 = _local_fit(V, inv_C2, window)
+
+    has_data = valid.any(axis=-1)
+    C_max = _np.where(has_data, _np.max(_np.where(valid, C, -_np.inf), axis=-1), _np.nan)
+    C_min = _np.where(has_data, _np.min(_np.where(valid, C, _np.inf), axis=-1), _np.nan)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        depth = eps_s / C
+        if mos:
+            depth = depth - eps_s / C_max[..., None]
+        doping = 2 / (q * eps_s * _np.abs(slope))
+
+    # median doping of the depletion region (away from the plateaus)
+    span = (C_max - C_min)[..., None]
+    depleted = (C > C_min[..., None] + 0.1 * span) & (C < C_max[..., None] - 0.1 * span)
+    if not mos:
+        depleted = valid
+    depleted &= _np.isfinite(doping)
+    N = _np.full(has_data.shape, _np.nan)
+    ok = depleted.any(axis=-1)
+    if ok.any():
+        N[ok] = _np.nanmedian(_np.where(depleted, doping, _np.nan)[ok], axis=-1)
+
+    # Mott-Schottky intercept of the most linear window
+    score = _np.where(_np.isfinite(r2) & (slope != 0), r2, -_np.inf)
+    best = _np.argmax(score, axis=-1)[..., None]
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        V_intercept = (-_np.take_along_axis(intercept, best, axis=-1)
+                       / _np.take_along_axis(slope, best, axis=-1))[..., 0]
+    V_intercept = _np.where(_np.isfinite(score).any(axis=-1), V_intercept, _np.nan)
+
+    if mos:
+        Cox = C_max
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            debye = _np.sqrt(eps_s * k * temperature / (q ** 2 * N))
+            C_s = eps_s / debye
+            C_fb = Cox * C_s / (Cox + C_s)
+        Vfb = _crossing(V, C, C_fb)
+    else:
+        Cox = _np.full(has_data.shape, _np.nan)
+        Vfb = _np.full(has_data.shape, _np.nan)
+    return CVProfile(inv_C2, depth, doping, Cox, N, Vfb, V_intercept)
+
+
+def _crossing(x, y, level):
+    # x where y first crosses level (per curve), by linear interpolation
+    d = y - level[..., None]
+    sign_change = (d[..., :-1] * d[..., 1:] <= 0) & _np.isfinite(d[..., :-1] * d[..., 1:])
+    i = _np.argmax(sign_change, axis=-1)[..., None]
+    x0, x1 = (_np.take_along_axis(x, i + s, axis=-1)[..., 0] for s in (0, 1))
+    d0, d1 = (_np.take_along_axis(d, i + s, axis=-1)[..., 0] for s in (0, 1))
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = _np.where(d0 == d1, x0, x0 + (x1 - x0) * d0 / (d0 - d1))
+    return _np.where(sign_change.any(axis=-1), x_cross, _np.nan)
+
+
+def cv_summary(df, area, V_col="V", C_col="C", group_cols=("fname", "Freq"), **kwargs):
+    """
+    Per-curve C-V parameters of a long-format frame, one row per group
+    (e.g. every file and frequency of ECC133.load_ECC133_folder).
+
+    Parameters:
+        df (pd.DataFrame): C-V data.
+        area (float): Device area (cm^2).
+        V_col, C_col (str): voltage and capacitance columns.
+        group_cols (sequence): columns identifying one sweep; those missing
+            from df are skipped.
+        **kwargs: passed to cv_analysis.
+
+    Returns:
+        pd.DataFrame: Cox, N, Vfb and V_intercept indexed by group_cols.
+    """
+    group_cols = [col for col in group_cols if col in df.columns]
+    V, C, levels = _stack_curves(df, V_col, C_col, group_cols)
+    profile = cv_analysis(V, C, area, **kwargs)
+    # without group columns the whole frame is one curve
+    index = _pd.MultiIndex.from_product(levels) if levels else _pd.RangeIndex(1)
+    summary = _pd.DataFrame({name: getattr(profile, name).ravel()
+                             for name in ("Cox", "N", "Vfb", "V_intercept")}, index=index)
+    # drop group combinations that were never measured
+    return summary[_np.isfinite(V).any(axis=-1).ravel()]
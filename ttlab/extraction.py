@@ -0,0 +1,170 @@
+"""
+Transistor Parameter Extraction
+===============================
+
+Batched extraction of threshold voltage, subthreshold swing, peak
+transconductance, mobility and on/off ratio from Id-Vg sweeps.
+
+Every function works on stacked arrays whose last axis is the sweep, e.g.
+(device, var2, points) from stack_curves; sweeps of unequal length are
+padded with NaN.
+"""
+
+import numpy as _np
+import pandas as _pd
+from collections import namedtuple as _namedtuple
+
+
+def stack_curves(df, x_col, y_col, group_cols):
+    """
+    Stack long-format sweeps into (group1, group2, ..., points) arrays.
+
+    Rows keep their order within a group; groups are indexed in order of
+    first appearance, with a NaN key as the last level of its axis.
+    Missing groups and short sweeps are padded with NaN.
+
+    Args:
+        df (pd.DataFrame): long-format data, e.g. from ECC133.load_ECC133_folder.
+        x_col (str): sweep variable column, e.g. "Vg".
+        y_col (str): measured column, e.g. "Id".
+        group_cols (list): columns spanning the leading axes, e.g.
+            ["fname", "Vd"]; empty for a single curve of shape (points,).
+
+    Returns:
+        (X, Y, levels): arrays of shape (*len(levels[i]), points) and the
+        group labels of each leading axis (list of pd.Index).
+    """
+    if isinstance(group_cols, str):
+        group_cols = [group_cols]
+    codes, levels = [], []
+    for col in group_cols:
+        code, level = _pd.factorize(df[col])
+        if (code < 0).any():
+            # missing keys (e.g. a file without var2) form their own, last level
+            code = _np.where(code < 0, len(level), code)
+            level = level.append(_pd.Index([_np.nan]))
+        codes.append(code)
+        levels.append(_pd.Index(level, name=col))
+    shape = tuple(len(level) for level in levels)
+    if codes:
+        flat = _np.ravel_multi_index(codes, shape)
+    else:
+        flat = _np.zeros(len(df), dtype=_np.intp)     # a single curve
+    order = _np.argsort(flat, kind="stable")
+    flat = flat[order]
+    counts = _np.bincount(flat, minlength=int(_np.prod(shape)))
+    starts = _np.concatenate(([0], _np.cumsum(counts)[:-1]))
+    pos = _np.arange(len(flat)) - starts[flat]
+    n_points = counts.max() if len(flat) else 0
+
+    stacked = []
+    for col in (x_col, y_col):
+        out = _np.full((counts.size, n_points), _np.nan)
+        out[flat, pos] = df[col].to_numpy(dtype=float)[order]
+        stacked.append(out.reshape(shape + (n_points,)))
+    return stacked[0], stacked[1], levels
+
+
+def derivative(x, y):
+    """
+    dy/dx along the last axis of stacked sweeps.
+
+    Central differences inside the sweep and one-sided differences at the
+    ends, with per-curve (non-uniform) x.
+
+    Args:
+        x, y (array-like): arrays of shape (..., points); x broadcasts to y.
+
+    Returns:
+        np.ndarray: dy/dx with the shape of y.
+    """
+    y = _np.asarray(y, dtype=float)
+    x = _np.broadcast_to(_np.asarray(x, dtype=float), y.shape)
+    d = _np.empty_like(y)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        d[..., 1:-1] = (y[..., 2:] - y[..., :-2]) / (x[..., 2:] - x[..., :-2])
+        d[..., 0] = (y[..., 1] - y[..., 0]) / (x[..., 1] - x[..., 0])
+        d[..., -1] = (y[..., -1] - y[..., -2]) / (x[..., -1] - x[..., -2])
+    return d
+
+
+TransferParams = _namedtuple("TransferParams", [
+    "Vth", "SS", "gm_max", "Vg_gm_max", "mobility", "Ion", "Ioff", "on_off"])
+TransferParams.__doc__ = """
+Per-curve result of extract_transfer (arrays of the leading shape).
+
+Vth: threshold voltage (V) by linear extrapolation at peak gm.
+SS: minimum subthreshold swing (mV/dec).
+gm_max, Vg_gm_max: peak transconductance (S) and its gate voltage (V).
+mobility: linear-region field-effect mobility (cm^2/Vs), NaN without
+    W, L, Cox and Vd.
+Ion, Ioff, on_off: maximum and minimum |Id| (A) and their ratio.
+Curves without valid points are NaN.
+"""
+
+
+def _take_last(a, index):
+    # a[..., index] for an index array of the leading shape
+    return _np.take_along_axis(a, index[..., None], axis=-1)[..., 0]
+
+
+def extract_transfer(Vg, Id, W=None, L=None, Cox=None, Vd=None, polarity=1,
+                     I_floor=0.0):
+    """
+    Extract transfer-curve parameters of every stacked Id-Vg sweep at once.
+
+    Args:
+        Vg (array-like): gate voltage (V), shape (..., points) or (points,).
+        Id (array-like): drain current (A), shape (..., points).
+        W, L (float): channel width and length (same unit).
+        Cox (float): gate capacitance per area (F/cm^2).
+        Vd (float or array-like): drain voltage (V), broadcastable to the
+            leading shape, e.g. the var2 values with shape (1, n_var2).
+        polarity (int): 1 for n-type, -1 for p-type (Vg and Id are mirrored,
+            Vth is reported in the original sign).
+        I_floor (float): |Id| at or below this is excluded from SS and Ioff.
+
+    Returns:
+        TransferParams
+    """
+    Id = _np.asarray(Id, dtype=float)
+    Vg = _np.broadcast_to(_np.asarray(Vg, dtype=float), Id.shape) * polarity
+    I = _np.abs(Id)
+    valid = _np.isfinite(Vg) & _np.isfinite(I)
+    above = valid & (I > I_floor)
+    all_nan = ~valid.any(axis=-1)
+
+    # peak transconductance
+    gm = _np.where(valid, derivative(Vg, I), _np.nan)
+    gm_ok = _np.isfinite(gm)
+    peak = _np.argmax(_np.where(gm_ok, gm, -_np.inf), axis=-1)
+    has_gm = gm_ok.any(axis=-1)
+    gm_max = _np.where(has_gm, _take_last(gm, peak), _np.nan)
+    Vg_peak = _np.where(has_gm, _take_last(Vg, peak), _np.nan)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        Vth = (Vg_peak - _take_last(I, peak) / gm_max) * polarity
+
+    # steepest decade per volt below the peak-gm point
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        logI = _np.where(above, _np.log10(_np.where(above, I, 1.0)), _np.nan)
+        slope = derivative(Vg, logI)
+    below_peak = _np.arange(I.shape[-1]) <= peak[..., None]
+    slope = _np.where(below_peak & (slope > 0), slope, _np.nan)
+    has_ss = _np.isfinite(slope).any(axis=-1)
+    max_slope = _np.max(_np.where(_np.isfinite(slope), slope, -_np.inf), axis=-1)
+    SS = _np.where(has_ss, 1e3 / max_slope, _np.nan)
+
+    # on/off currents
+    Ion = _np.where(all_nan, _np.nan, _np.max(_np.where(valid, I, -_np.inf), axis=-1))
+    Ioff = _np.min(_np.where(above, I, _np.inf), axis=-1)
+    Ioff = _np.where(_np.isfinite(Ioff), Ioff, _np.nan)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        on_off = Ion / Ioff
+
+    if any(v is None for v in (W, L, Cox, Vd)):
+        mobility = _np.full(gm_max.shape, _np.nan)
+    else:
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            mobility = gm_max * L / (W * Cox * _np.abs(_np.asarray(Vd, dtype=float)))
+        mobility = _np.broadcast_to(mobility, gm_max.shape).copy()
+    return TransferParams(Vth, SS, gm_max, Vg_peak * polarity, mobility, Ion, Ioff, on_off)
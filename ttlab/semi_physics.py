@@ -5,6 +5,9 @@ Semiconductor Physics Module
 This module contains functions for semiconductor physics calculations.
 """
 
+import functools as _functools
+from collections import namedtuple as _namedtuple
+
 import numpy as _np
 
 def intrinsic_carrier_concentration(Nc, Nv, Eg, TL, k=8.617333262e-5):
@@ -30,3 +33,335 @@ def intrinsic_carrier_concentration(Nc, Nv, Eg, TL, k=8.617333262e-5):
 # Example usage
 # result = intrinsic_carrier_concentration(1e19, 1e19, 1.12, 300)
 # print(result)
+
+
+# Material parameters at 300 K unless noted.
+#   Eg0, alpha, beta: Varshni band gap Eg(T) = Eg0 - alpha T^2 / (T + beta) (eV, eV/K, K)
+#   Nc, Nv: effective densities of states at 300 K (cm^-3), scaled as T^1.5
+#   eps_r: relative permittivity
+#   mu_n, mu_p: Caughey-Thomas (mu_min, mu_max, Nref, alpha, theta) with
+#       mu_max(T) = mu_max (T/300)^-theta (cm^2/Vs, cm^-3)
+MATERIALS = {
+    "Si": dict(Eg0=1.170, alpha=4.73e-4, beta=636.0, Nc=2.8e19, Nv=1.04e19, eps_r=11.7,
+               mu_n=(52.2, 1417.0, 9.68e16, 0.68, 2.5),
+               mu_p=(44.9, 470.5, 2.23e17, 0.719, 2.2)),
+    "Ge": dict(Eg0=0.7437, alpha=4.774e-4, beta=235.0, Nc=1.04e19, Nv=6.0e18, eps_r=16.0,
+               mu_n=(850.0, 3900.0, 2.6e17, 0.56, 1.66),
+               mu_p=(300.0, 1900.0, 1.0e17, 1.0, 2.33)),
+    "GaAs": dict(Eg0=1.519, alpha=5.405e-4, beta=204.0, Nc=4.7e17, Nv=7.0e18, eps_r=12.9,
+                 mu_n=(500.0, 8500.0, 6.0e16, 0.394, 2.1),
+                 mu_p=(20.0, 491.5, 1.48e17, 0.38, 2.2)),
+    "4H-SiC": dict(Eg0=3.265, alpha=6.5e-4, beta=1300.0, Nc=1.69e19, Nv=2.49e19, eps_r=9.7,
+                   mu_n=(40.0, 947.0, 1.94e17, 0.61, 2.4),
+                   mu_p=(15.9, 124.0, 1.76e19, 0.34, 2.15)),
+    "GaN": dict(Eg0=3.47, alpha=7.7e-4, beta=600.0, Nc=2.3e18, Nv=4.6e19, eps_r=8.9,
+                mu_n=(55.0, 1000.0, 2.0e17, 1.0, 1.5),
+                mu_p=(3.0, 170.0, 3.0e17, 2.0, 5.0)),
+}
+MATERIALS["SiC"] = MATERIALS["4H-SiC"]
+
+
+def material(name):
+    """
+    Parameters of a material in MATERIALS (case-insensitive name).
+
+    Args:
+        name (str or dict): material name, or a parameter dict (returned as is).
+
+    Returns:
+        dict: material parameters.
+    """
+    if isinstance(name, dict):
+        return name
+    for key, params in MATERIALS.items():
+        if key.lower() == str(name).lower():
+            return params
+    raise ValueError(f"Unknown material {name!r}; available: {', '.join(MATERIALS)}")
+
+
+def bandgap(name, T):
+    """
+    Varshni band gap Eg(T) = Eg0 - alpha T^2 / (T + beta).
+
+    Args:
+        name (str): material name.
+        T (float or array-like): lattice temperature (in Kelvin).
+
+    Returns:
+        float or np.ndarray: band gap (in eV).
+
+    Examples:
+        >>> bandgap("Si", 300)
+        1.1245
+    """
+    p = material(name)
+    T = _np.asarray(T, dtype=float)
+    return p["Eg0"] - p["alpha"] * T ** 2 / (T + p["beta"])
+
+
+def density_of_states(name, T):
+    """
+    Effective densities of states scaled from 300 K as (T/300)^1.5.
+
+    Args:
+        name (str): material name.
+        T (float or array-like): lattice temperature (in Kelvin).
+
+    Returns:
+        tuple: (Nc, Nv) in cm^-3.
+    """
+    p = material(name)
+    scale = (_np.asarray(T, dtype=float) / 300.0) ** 1.5
+    return p["Nc"] * scale, p["Nv"] * scale
+
+
+def intrinsic_concentration(name, T):
+    """
+    Intrinsic carrier concentration of a material at temperature T.
+
+    Args:
+        name (str): material name.
+        T (float or array-like): lattice temperature (in Kelvin).
+
+    Returns:
+        float or np.ndarray: n_i (cm^-3).
+
+    Examples:
+        >>> intrinsic_concentration("Si", 300)
+        6.12e9
+    """
+    Nc, Nv = density_of_states(name, T)
+    return intrinsic_carrier_concentration(Nc, Nv, bandgap(name, T), _np.asarray(T, dtype=float))
+
+
+def mobility(name, N, T=300, carrier="n"):
+    """
+    Caughey-Thomas low-field mobility, broadcasting over doping and temperature.
+
+    Args:
+        name (str): material name.
+        N (float or array-like): total ionized doping (cm^-3).
+        T (float or array-like): lattice temperature (in Kelvin).
+        carrier (str): "n" (electrons) or "p" (holes).
+
+    Returns:
+        float or np.ndarray: mobility (cm^2/Vs), shape of N and T broadcast.
+
+    Examples:
+        >>> mobility("Si", [1e15, 1e18], T=[[300], [400]]).shape
+        (2, 2)
+    """
+    mu_min, mu_max, Nref, alpha, theta = material(name)[f"mu_{carrier}"]
+    N = _np.asarray(N, dtype=float)
+    T = _np.asarray(T, dtype=float)
+    mu_lattice = mu_max * (T / 300.0) ** -theta
+    return mu_min + (mu_lattice - mu_min) / (1 + (N / Nref) ** alpha)
+
+
+class MaterialTable:
+    """
+    Precomputed temperature tables of a material for hot loops.
+
+    Band gap, densities of states and log n_i are tabulated on a uniform
+    temperature grid and linearly interpolated, which replaces the powers
+    and exponentials by an index computation. Temperatures are clipped to
+    the table range. Mobility is not tabulated: the Caughey-Thomas form is
+    already cheaper than a 2-D lookup.
+
+    Args:
+        name (str): material name.
+        T_range (tuple): (T_min, T_max) in Kelvin.
+        n_T (int): temperature grid points.
+    """
+
+    def __init__(self, name, T_range=(200.0, 600.0), n_T=801):
+        self.name = name
+        self.T = _np.linspace(T_range[0], T_range[1], n_T)
+        self.Eg = bandgap(name, self.T)
+        self.Nc, self.Nv = density_of_states(name, self.T)
+        self.log_ni = _np.log(intrinsic_concentration(name, self.T))
+        self._dT = self.T[1] - self.T[0]
+
+    def _interp(self, table, T):
+        pos = (_np.clip(_np.asarray(T, dtype=float), self.T[0], self.T[-1]) - self.T[0]) / self._dT
+        i = _np.minimum(pos.astype(_np.intp), len(self.T) - 2)
+        f = pos - i
+        return table[i] * (1 - f) + table[i + 1] * f
+
+    def bandgap(self, T):
+        """Interpolated band gap (eV)."""
+        return self._interp(self.Eg, T)
+
+    def density_of_states(self, T):
+        """Interpolated (Nc, Nv) (cm^-3)."""
+        return self._interp(self.Nc, T), self._interp(self.Nv, T)
+
+    def intrinsic_concentration(self, T):
+        """Interpolated n_i (cm^-3), linear in log n_i."""
+        return _np.exp(self._interp(self.log_ni, T))
+
+
+@_functools.lru_cache(maxsize=16)
+def material_table(name, T_range=(200.0, 600.0), n_T=801):
+    """
+    Cached MaterialTable: the tables of a material are built once per
+    set of arguments and reused.
+
+    Args:
+        name (str): material name.
+        T_range (tuple), n_T (int): temperature grid, as in MaterialTable.
+
+    Returns:
+        MaterialTable
+    """
+    return MaterialTable(name, T_range, n_T)
+
+
+def _solve_tridiagonal(a, b, c, d):
+    """
+    Solve tridiagonal systems a_i x_(i-1) + b_i x_i + c_i x_(i+1) = d_i along
+    the last axis (batched over the leading axes) by cyclic reduction.
+
+    Each of the log2(n) levels is one vectorized step, O(n) work in total.
+    Stable for diagonally dominant systems. a[..., 0] and c[..., -1] are
+    ignored.
+    """
+    n = d.shape[-1]
+    size = 1
+    while size < n:
+        size = 2 * size + 1
+    lead = d.shape[:-1]
+    a, b, c, d = (_np.broadcast_to(v, lead + (n,)) for v in (a, b, c, d))
+    # pad with decoupled identity rows up to 2^k - 1 unknowns
+    pad = [(0, 0)] * len(lead) + [(0, size - n)]
+    a = _np.pad(a, pad)
+    c = _np.pad(c, pad)
+    d = _np.pad(d, pad)
+    b = _np.pad(b, pad, constant_values=1.0)
+    a[..., 0] = 0.0
+    c[..., n - 1] = 0.0
+    return _cyclic_reduction(a, b, c, d)[..., :n]
+
+
+def _cyclic_reduction(a, b, c, d):
+    if d.shape[-1] == 1:
+        return d / b
+    ae, be, ce, de = a[..., 0::2], b[..., 0::2], c[..., 0::2], d[..., 0::2]
+    ao, bo, co, do = a[..., 1::2], b[..., 1::2], c[..., 1::2], d[..., 1::2]
+    # eliminate the even unknowns from the odd equations
+    alpha = -ao / be[..., :-1]
+    gamma = -co / be[..., 1:]
+    x_odd = _cyclic_reduction(
+        alpha * ae[..., :-1],
+        bo + alpha * ce[..., :-1] + gamma * ae[..., 1:],
+        gamma * ce[..., 1:],
+        do + alpha * de[..., :-1] + gamma * de[..., 1:])
+    zero = _np.zeros(x_odd.shape[:-1] + (1,))
+    x = _np.empty(d.shape)
+    x[..., 1::2] = x_odd
+    x[..., 0::2] = (de - ae * _np.concatenate([zero, x_odd], axis=-1)
+                    - ce * _np.concatenate([x_odd, zero], axis=-1)) / be
+    return x
+
+
+PoissonSolution = _namedtuple("PoissonSolution", [
+    "x", "psi", "n", "p", "E", "Ec", "Ev", "depletion_width", "converged", "iterations"])
+PoissonSolution.__doc__ = """
+Result of solve_poisson_1d. Profile arrays have the shape of the doping.
+
+x: mesh (cm).
+psi: electrostatic potential (V) relative to the intrinsic level, Fermi level at 0.
+n, p: electron and hole concentrations (cm^-3).
+E: electric field (V/cm) at the nodes.
+Ec, Ev: band edges (eV) relative to the Fermi level.
+depletion_width: integral of the uncompensated fraction |p - n + N| / |N|
+    over the mesh (cm), per profile.
+converged: per-profile convergence flag; iterations: Newton steps taken.
+"""
+
+
+def solve_poisson_1d(x, doping, name="Si", T=300, tol=1e-8, max_iter=100):
+    """
+    Equilibrium 1-D Poisson solution of doping profiles.
+
+    Solves d/dx(eps dpsi/dx) = -q (p - n + N) with Boltzmann carriers by
+    Newton iteration on a box discretization of the non-uniform mesh; each
+    step is a batched tridiagonal solve, O(N) per profile. Contacts are
+    ohmic: psi is held at its charge-neutral value at both ends.
+
+    Args:
+        x (array-like): strictly increasing mesh (cm), shape (points,) or
+            (profiles, points). Silvaco cutlines are in um: pass y * 1e-4.
+        doping (array-like): net doping Nd - Na (cm^-3), shape (points,) or
+            (profiles, points).
+        name (str): material name (see MATERIALS).
+        T (float): lattice temperature (in Kelvin).
+        tol (float): convergence on the Newton update (in units of kT/q).
+        max_iter (int): maximum Newton iterations.
+
+    Returns:
+        PoissonSolution
+
+    Examples:
+        >>> x = np.linspace(0, 2e-4, 2001)
+        >>> sol = solve_poisson_1d(x, np.where(x < 1e-4, -1e16, 1e16))
+        >>> sol.psi[-1] - sol.psi[0]
+        0.7397
+    """
+    q = 1.602e-19       # Elementary charge (C)
+    k = 8.617333262e-5  # Boltzmann constant (eV/K)
+    eps0 = 8.854e-14    # Vacuum permittivity (F/cm)
+
+    doping = _np.asarray(doping, dtype=float)
+    x = _np.asarray(x, dtype=float)
+    shape = _np.broadcast_shapes(x.shape, doping.shape)
+    x = _np.broadcast_to(x, shape)
+    doping = _np.broadcast_to(doping, shape)
+    h = _np.diff(x, axis=-1)
+    if shape[-1] < 3 or not (h > 0).all():
+        raise ValueError("x must be strictly increasing with at least 3 points")
+
+    p_mat = material(name)
+    Vt = k * T
+    ni = intrinsic_concentration(p_mat, T)
+    Nc, Nv = density_of_states(p_mat, T)
+    K = p_mat["eps_r"] * eps0 * Vt / (q * ni)
+
+    C = doping / ni
+    box = _np.zeros(shape)
+    box[..., 1:] += h / 2
+    box[..., :-1] += h / 2
+    lower = _np.zeros(shape)
+    upper = _np.zeros(shape)
+    lower[..., 1:-1] = K / h[..., :-1]
+    upper[..., 1:-1] = K / h[..., 1:]
+
+    # charge-neutral start, also the ohmic boundary values
+    u = _np.arcsinh(C / 2)
+    converged = _np.zeros(shape[:-1], dtype=bool)
+    for iteration in range(1, max_iter + 1):
+        en, ep = _np.exp(u), _np.exp(-u)
+        F = _np.zeros(shape)
+        flux = _np.diff(u, axis=-1) / h * K
+        F[..., 1:-1] = flux[..., 1:] - flux[..., :-1] + box[..., 1:-1] * (ep - en + C)[..., 1:-1]
+        diag = _np.ones(shape)
+        diag[..., 1:-1] = -lower[..., 1:-1] - upper[..., 1:-1] - box[..., 1:-1] * (en + ep)[..., 1:-1]
+        du = _solve_tridiagonal(lower, diag, upper, -F)
+        # logarithmic damping of large steps
+        big = _np.abs(du) > 1
+        du = _np.where(big, _np.sign(du) * (1 + _np.log(_np.where(big, _np.abs(du), 1.0))), du)
+        u = u + du
+        converged = _np.max(_np.abs(du), axis=-1) < tol
+        if converged.all():
+            break
+
+    psi = u * Vt
+    n, p = ni * _np.exp(u), ni * _np.exp(-u)
+    E = -_np.gradient(psi, axis=-1) / _np.gradient(x, axis=-1)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        uncompensated = _np.where(doping != 0,
+                                  _np.minimum(_np.abs(p - n + doping) / _np.abs(doping), 1.0), 0.0)
+    depletion_width = _np.sum(uncompensated * box, axis=-1)
+    Ec = -psi + Vt * _np.log(Nc / ni)
+    Ev = -psi - Vt * _np.log(Nv / ni)
+    return PoissonSolution(x, psi, n, p, E, Ec, Ev, depletion_width, converged, iteration)
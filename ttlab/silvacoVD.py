@@ -8,16 +8,51 @@ Created on Fri Jan 15 09:36:42 2025
 #Silvaco Victory output Support library
 
 from pathlib import Path as _Path
+from collections import deque as _deque
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor
+import copy as _copy
+import io as _io
+import numpy as _np
 import pandas as _pd
 import re as _re
 import os as _os
 import shlex as _shlex
 from typing import Tuple as _Tuple
-from collections import defaultdict as _defaultdict
+from ._cache import ParseCache
+from ._cache import resolve_cache as _resolve_cache
+
+# Bump when a parser's output changes so cached results are invalidated
+_LOG_PARSER_VERSION = 1
+_STR_PARSER_VERSION = 2
 
 # Function that reads Silvaco Log
-def read_victory_log_to_dataframe(file_path):
-    data = []
+def read_victory_log_to_dataframe(file_path, cache=None):
+    """
+    Read a Victory .log file into a DataFrame.
+
+    Args:
+        file_path: path to the .log file
+        cache: None/False (no cache), True (default cache directory),
+            a cache directory, or a ParseCache instance.
+
+    Returns:
+        DataFrame of the 'd' records, columns named through the 'Q' records.
+    """
+    cache = _resolve_cache(cache)
+    if cache is not None:
+        arrays = cache.load(file_path, 'log', _LOG_PARSER_VERSION)
+        if arrays is not None:
+            return _pd.DataFrame(arrays['values'], columns=list(arrays['columns']))
+
+    df = _parse_victory_log(file_path)
+    if cache is not None:
+        cache.store(file_path, 'log', _LOG_PARSER_VERSION,
+                    {'values': df.to_numpy(dtype=float),
+                     'columns': _np.array(df.columns, dtype=str)})
+    return df
+
+def _parse_victory_log(file_path):
+    d_lines = []
     column_map = {}
     columns = []
     
@@ -35,125 +70,1335 @@ def read_victory_log_to_dataframe(file_path):
                 if col_index in columns:
                     column_map[col_index] = col_name
             
-            # Extract the data from 'd' lines
+            # Collect the 'd' lines, converted in bulk below
             if line.startswith('d'):
-                values = line.split()[1:]
-                data.append([float(num) for num in values])
+                d_lines.append(line)
     
     # Map the columns using the column map
     column_names = [column_map.get(col, f"Column_{col}") for col in columns]
 
+    data = _d_records_to_array(d_lines, len(column_names))
+    if data is None:
+        # Irregular block: convert line by line
+        data = [[float(num) for num in line.split()[1:]] for line in d_lines]
+
     # Create DataFrame with the mapped column names
     df = _pd.DataFrame(data, columns=column_names)
     
     return df
 
-def read_all_logs_in_directory(directory):
-    all_data = []  # List to store DataFrames from all log files
-    log_dir = _Path(directory)
-    skip_hidden = False
-    
-    pattern = r"_([a-zA-Z]+)([\d.eE+-]+)"
-    # Iterate through all .log files in the directory
-    for log_file in log_dir.glob("*.log"):
-        if log_file.name.startswith("."):
-            skip_hidden = True
-            continue
-        # Extract metadata from the file name
+def _d_records_to_array(d_lines, n_columns):
+    """
+    Convert 'd' record lines into an (n_rows, n_columns) float array in bulk.
+
+    Uses the pyarrow CSV reader when it is installed and NumPy's text
+    parser otherwise; both round floats exactly like float(). Returns None
+    when the block is not a regular table (ragged rows, stray whitespace)
+    so the caller can fall back to per-line parsing.
+    """
+    if not d_lines or not n_columns:
+        return None
+    text = "".join(d_lines)
+    if not text.endswith("\n"):
+        text += "\n"
+
+    try:
+        import pyarrow as _pa
+        import pyarrow.csv as _pacsv
+    except ImportError:
+        _pa = None
+    if _pa is not None:
+        names = [f"f{i}" for i in range(n_columns + 1)]
         try:
-            df = read_victory_log_to_dataframe(log_file)
-        except Exception as e:
-            print(f"Error reading {log_file}: {e}")
-            continue
-        filename = log_file.stem
-        simulation_name = filename.split("_")[0]
-        df["name"] = simulation_name
-        matches = _re.findall(pattern, log_file.stem)
-        if matches:
-            for key, value in matches:
-                df[key] = value
-        all_data.append(df)
-    
-    # Concatenate all DataFrames into a single DataFrame
-    final_df = _pd.concat(all_data, ignore_index=True)
-    if skip_hidden:
+            table = _pacsv.read_csv(
+                _pa.py_buffer(text.encode()),
+                read_options=_pacsv.ReadOptions(column_names=names),
+                parse_options=_pacsv.ParseOptions(delimiter=' ', quote_char=False),
+                convert_options=_pacsv.ConvertOptions(
+                    column_types={name: _pa.float64() for name in names[1:]},
+                    include_columns=names[1:]))
+        except (_pa.ArrowInvalid, _pa.ArrowNotImplementedError):
+            table = None
+        if (table is not None and table.num_rows == len(d_lines)
+                and not any(col.null_count for col in table.columns)):
+            return _np.column_stack([col.to_numpy() for col in table.columns])
+
+    # drop the record letter of every line, then parse the numbers in C
+    payload = _re.sub(r"(?m)^\S*", "", text)
+    try:
+        values = _np.loadtxt(_io.StringIO(payload), dtype=float, ndmin=2, comments=None)
+    except ValueError:
+        return None
+    if values.shape != (len(d_lines), n_columns):
+        return None
+    return values
+
+class VictoryLogTail:
+    """
+    Incremental reader for a Victory .log that is still being written.
+
+    Each poll() reads only the bytes appended since the previous call and
+    appends the new 'd' rows to a growable array, so monitoring a long run
+    costs time proportional to the new data instead of the file size.
+
+    Args:
+        file_path: path to the .log file (it may not exist yet)
+        capacity: initial number of preallocated rows
+    """
+
+    _TAIL_BYTES = 256
+
+    def __init__(self, file_path, capacity=1024):
+        self.file_path = _Path(file_path)
+        self._initial_capacity = capacity
+        self.reset()
+
+    def reset(self):
+        """Forget everything read so far."""
+        self.offset = 0
+        self.columns = []
+        self.column_map = {}
+        self.n_rows = 0
+        self._data = _np.empty((self._initial_capacity, 0))
+        # inode and last bytes before offset, to notice a rewritten file
+        self._inode = None
+        self._tail = b""
+
+    @property
+    def column_names(self):
+        return [self.column_map.get(col, f"Column_{col}") for col in self.columns]
+
+    @property
+    def values(self) -> _np.ndarray:
+        """View of the rows read so far."""
+        return self._data[:self.n_rows]
+
+    def _append(self, rows):
+        # the column count is fixed once rows exist (see poll)
+        needed = self.n_rows + len(rows)
+        if needed > len(self._data) or self._data.shape[1] != rows.shape[1]:
+            capacity = max(2 * len(self._data), needed, self._initial_capacity)
+            grown = _np.empty((capacity, rows.shape[1]))
+            if self.n_rows:
+                grown[:self.n_rows] = self._data[:self.n_rows]
+            self._data = grown
+        self._data[self.n_rows:needed] = rows
+        self.n_rows = needed
+
+    def poll(self) -> int:
+        """
+        Parse the lines appended since the last call.
+
+        A trailing line without newline is left for the next poll. If the
+        file was replaced or rewritten (the simulator restarted the run),
+        which shows as a new inode, a smaller size or changed bytes just
+        before the read offset, it is read from the start.
+
+        Returns:
+            Number of new data rows.
+        """
+        try:
+            stat = self.file_path.stat()
+        except FileNotFoundError:
+            return 0
+        with open(self.file_path, 'rb') as file:
+            if self.offset and not self._same_file(file, stat):
+                self.reset()
+            if stat.st_size <= self.offset:
+                return 0
+            file.seek(self.offset)
+            chunk = file.read(stat.st_size - self.offset)
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+
+        # parse into locals first so a rejected chunk leaves the state as is
+        columns = self.columns
+        column_map = dict(self.column_map)
+        d_lines = []
+        for line in chunk[:end].decode().splitlines(keepends=True):
+            if line.startswith('p'):
+                new_columns = line.split()[2:]
+                if new_columns != columns and (self.n_rows or d_lines):
+                    raise ValueError(
+                        f"{self.file_path}: a 'p' record changes the columns from "
+                        f"{columns} to {new_columns} after data rows were read.")
+                columns = new_columns
+            if line.startswith('Q'):
+                parts = line.split()
+                if parts[1] in columns:
+                    column_map[parts[1]] = ' '.join(parts[3:]).strip('"')
+            if line.startswith('d'):
+                d_lines.append(line)
+        rows = None
+        if d_lines:
+            rows = _d_records_to_array(d_lines, len(columns))
+            if rows is None:
+                rows = [[float(num) for num in line.split()[1:]] for line in d_lines]
+                rows = _pd.DataFrame(rows, columns=range(len(columns))).to_numpy(dtype=float)
+
+        self.offset += end
+        self.columns = columns
+        self.column_map = column_map
+        self._inode = stat.st_ino
+        self._tail = (self._tail + chunk[:end])[-self._TAIL_BYTES:]
+        if rows is None:
+            return 0
+        self._append(rows)
+        return len(rows)
+
+    def _same_file(self, file, stat):
+        # whether the bytes read so far are still the start of the file
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            return False
+        file.seek(self.offset - len(self._tail))
+        return file.read(len(self._tail)) == self._tail
+
+    def to_dataframe(self) -> _pd.DataFrame:
+        """Rows read so far, as read_victory_log_to_dataframe returns them."""
+        return _pd.DataFrame(self.values.copy(), columns=self.column_names)
+
+
+class VictoryLogDirectoryTail:
+    """
+    Tail every .log file of a directory of running jobs.
+
+    Args:
+        directory: folder holding the .log files
+        pattern: glob pattern of the files to follow
+    """
+
+    def __init__(self, directory, pattern="*.log"):
+        self.directory = _Path(directory)
+        self.pattern = pattern
+        self.tails = {}
+
+    def poll(self) -> dict:
+        """
+        Pick up new files and poll all of them.
+
+        Returns:
+            {file name: number of new rows} for the files that grew.
+        """
+        for log_file in sorted(self.directory.glob(self.pattern)):
+            if log_file.name.startswith(".") or log_file.name in self.tails:
+                continue
+            self.tails[log_file.name] = VictoryLogTail(log_file)
+        new_rows = {}
+        for name, tail in self.tails.items():
+            n = tail.poll()
+            if n:
+                new_rows[name] = n
+        return new_rows
+
+    def dataframes(self) -> dict:
+        """{file name: DataFrame} of everything read so far."""
+        return {name: tail.to_dataframe() for name, tail in self.tails.items()}
+
+# Filename metadata, e.g. "diode_Vg1.5_L0.2.log" -> Vg=1.5, L=0.2
+_LOG_METADATA_PATTERN = r"_([a-zA-Z]+)([\d.eE+-]+)"
+
+def _log_metadata(stem):
+    metadata = {"name": stem.split("_")[0]}
+    for key, value in _re.findall(_LOG_METADATA_PATTERN, stem):
+        try:
+            metadata[key] = float(value)
+        except ValueError:
+            metadata[key] = value
+    return metadata
+
+def _read_log_with_metadata(args):
+    # Worker for iter_logs_in_directory; returns (path, df, error)
+    log_file, cache = args
+    try:
+        df = read_victory_log_to_dataframe(log_file, cache)
+    except Exception as e:
+        return log_file, None, e
+    for key, value in _log_metadata(log_file.stem).items():
+        df[key] = value
+    return log_file, df, None
+
+def iter_logs_in_directory(directory, workers=1, cache=None):
+    """
+    Parse every .log file in a directory, yielding one DataFrame per file.
+
+    Frames are yielded in file name order as soon as they are parsed, so a
+    large sweep can be consumed incrementally. Filename metadata
+    (e.g. "_Vg1.5") is added as numeric columns, plus a "name" column.
+
+    Args:
+        directory: folder holding the .log files
+        workers: number of worker processes; 1 parses in this process,
+            None uses one process per CPU.
+        cache: optional parse cache, see read_victory_log_to_dataframe()
+
+    Yields:
+        DataFrame of each readable log file.
+    """
+    log_dir = _Path(directory)
+    log_files = sorted(log_dir.glob("*.log"))
+    hidden = [f for f in log_files if f.name.startswith(".")]
+    if hidden:
         print("Skip hidden .log files")
+    jobs = [(f, cache) for f in log_files if not f.name.startswith(".")]
+
+    if workers == 1:
+        results = map(_read_log_with_metadata, jobs)
+    else:
+        results = _bounded_pool_map(_read_log_with_metadata, jobs, workers)
+    for log_file, df, error in results:
+        if error is not None:
+            print(f"Error reading {log_file}: {error}")
+            continue
+        yield df
+
+def _bounded_pool_map(func, jobs, workers):
+    """
+    Ordered pool.map that keeps at most 2 x workers jobs outstanding.
+
+    Results are produced only as fast as they are consumed, and closing
+    the generator early cancels the jobs not yet started.
+    """
+    workers = workers or _os.cpu_count() or 1
+    jobs = iter(jobs)
+    pending = _deque()
+    pool = _ProcessPoolExecutor(max_workers=workers)
+    try:
+        for job in jobs:
+            pending.append(pool.submit(func, job))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            job = next(jobs, None)
+            if job is not None:
+                pending.append(pool.submit(func, job))
+            yield result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def read_all_logs_in_directory(directory, workers=1, cache=None):
+    """
+    Parse every .log file in a directory into one DataFrame.
+
+    Args:
+        directory: folder holding the .log files
+        workers: number of worker processes; 1 parses in this process,
+            None uses one process per CPU.
+        cache: optional parse cache, see read_victory_log_to_dataframe()
+
+    Returns:
+        Concatenated DataFrame with a categorical "name" column and the
+        filename metadata as numeric columns (categorical when not numeric).
+    """
+    final_df = _pd.concat(iter_logs_in_directory(directory, workers, cache),
+                          ignore_index=True)
+    metadata = {"name"}
+    for log_file in _Path(directory).glob("*.log"):
+        metadata.update(key for key, _ in _re.findall(_LOG_METADATA_PATTERN, log_file.stem))
+    for col in metadata & set(final_df.columns):
+        if not _pd.api.types.is_numeric_dtype(final_df[col]):
+            final_df[col] = final_df[col].astype("category")
     return final_df
 
-def read_str_cutline(file_path: str, cutline: _Tuple[str, float]) -> _pd.DataFrame:
+def _records_to_array(lines, ncols=None):
+    """
+    Convert a list of .str record lines (record letter stripped) into a
+    2-D float array with a single bulk conversion.
+    """
+    if not lines:
+        return _np.empty((0, ncols or 0))
+    values = _np.array(" ".join(lines).split(), dtype=float)
+    return values.reshape(len(lines), -1)
+
+
+def _node_tables(node_rec, n_nodes):
+    """
+    Split 'n <id> <material> <values...>' records (0-based ids) into the
+    per-node table and the extra records of interface nodes.
+
+    Interface nodes are listed once per material; like the original reader,
+    the last record of a node goes into the node table.
+    """
+    nid = node_rec[:, 0].astype(int)
+    _, last = _np.unique(nid[::-1], return_index=True)
+    last = len(nid) - 1 - last
+    data = _np.full((n_nodes, node_rec.shape[1] - 1), _np.nan)
+    data[nid[last]] = node_rec[last, 1:]
+    extra = _np.ones(len(nid), dtype=bool)
+    extra[last] = False
+    interface = (nid[extra], node_rec[extra, 1].astype(int), node_rec[extra, 1:])
+    return data, interface
+
+
+class StrMesh:
+    """
+    Parsed Silvaco Victory .str structure held in NumPy arrays.
+
+    The file is read once; cutline queries afterwards only index into the
+    arrays, so pulling many cutlines from one structure is cheap.
+
+    Attributes:
+        x, y: node coordinates, indexed by node id - 1.
+        data: (n_nodes, n_fields) node data. Nodes without an 'n' record are NaN.
+        field_names: data column names, mapped through the 'Q' records.
+        node_material: material code of the 'n' record kept for each node.
+        triangles: (n_tri, 3) node indices of the 't' records.
+        tri_region: region number of each triangle.
+        region_material: {region: material code} from the 'r' records.
+        material_names: {material code: name}, e.g. {3: 'Silicon'}, from 'Q'.
+        interface_nodes, interface_material, interface_data: the extra 'n'
+            records of nodes listed once per material on an interface.
+    """
+
+    def __init__(self, x, y, data, field_names, node_material=None,
+                 triangles=None, tri_region=None, region_material=None,
+                 interface=None, material_names=None):
+        self.x = _np.asarray(x, dtype=float)
+        self.y = _np.asarray(y, dtype=float)
+        self.data = _np.asarray(data, dtype=float)
+        self.field_names = _np.asarray(field_names, dtype=object)
+        if node_material is None:
+            node_material = _np.full(len(self.x), -1)
+        self.node_material = _np.asarray(node_material, dtype=int)
+        if triangles is None:
+            triangles = _np.empty((0, 3), dtype=int)
+        self.triangles = _np.asarray(triangles, dtype=int).reshape(-1, 3)
+        if tri_region is None:
+            tri_region = _np.zeros(len(self.triangles), dtype=int)
+        self.tri_region = _np.asarray(tri_region, dtype=int)
+        self.region_material = dict(region_material or {})
+        self.material_names = dict(material_names or {})
+        if interface is None:
+            interface = ([], [], _np.empty((0, self.data.shape[1])))
+        self.interface_nodes = _np.asarray(interface[0], dtype=int)
+        self.interface_material = _np.asarray(interface[1], dtype=int)
+        self.interface_data = _np.asarray(interface[2], dtype=float)
+        self._axis_index = {}
+        self._locator = None
+        self._corner_rows = None
+        self._areas = None
+
+    @classmethod
+    def from_file(cls, file_path):
+        """
+        Parse a Silvaco .str file in a single pass.
+
+        Args:
+            file_path: path to the .str file
+
+        Returns:
+            StrMesh holding the coordinates, node data and triangles.
+        """
+        records = {'c': [], 'n': [], 't': []}
+        data_keys = []
+        q_names = {}
+        region_material = {}
+        material_names = {}
+
+        with open(file_path, 'r') as f:
+            for line in f:
+                tag = line[:2]
+                if tag == 'c ' or tag == 'n ' or tag == 't ':
+                    records[tag[0]].append(line[2:])
+                elif tag == 's ':
+                    data_keys = line.split()[1:]
+                elif tag == 'r ':
+                    parts = line.split()
+                    region_material[int(parts[1])] = int(parts[2])
+                elif tag == 'Q ':
+                    parts = _shlex.split(line)
+                    q_names[parts[1]] = parts[3]
+                    # key/value pairs follow the id; key 21 is a material name
+                    for key, value in zip(parts[2::2], parts[3::2]):
+                        if key == '21':
+                            material_names[int(parts[1])] = value
+
+        if not data_keys:
+            raise ValueError("No data header ('s') found in file.")
+        if not records['n']:
+            raise ValueError("No node data ('n') found in file.")
+
+        coords = _records_to_array(records['c'])
+        node_rec = _records_to_array(records['n'])
+        tri_rec = _records_to_array(records['t'], 8).astype(int)
+
+        # 'c <id> <x> <y> <z>' with 1-based ids
+        n_nodes = int(coords[:, 0].max()) if len(coords) else 0
+        x = _np.full(n_nodes, _np.nan)
+        y = _np.full(n_nodes, _np.nan)
+        cid = coords[:, 0].astype(int) - 1
+        x[cid] = coords[:, 1]
+        y[cid] = coords[:, 2]
+
+        n_nodes = max(n_nodes, int(node_rec[:, 0].max()) + 1)
+        if len(x) < n_nodes:
+            x = _np.concatenate([x, _np.full(n_nodes - len(x), _np.nan)])
+            y = _np.concatenate([y, _np.full(n_nodes - len(y), _np.nan)])
+        data, interface = _node_tables(node_rec, n_nodes)
+        field_names = [q_names.get(key, key) for key in data_keys]
+        # The first 'n' value is the node material, listed under the count
+        # token of the 's' header.
+        node_material = _np.nan_to_num(data[:, 0], nan=-1).astype(int)
+
+        # 't <id> <region> <n1> <n2> <n3> <neighbours...>' with 1-based nodes
+        triangles = tri_rec[:, 2:5] - 1
+        tri_region = tri_rec[:, 1]
+        return cls(x, y, data, field_names, node_material,
+                   triangles, tri_region, region_material, interface,
+                   material_names)
+
+    def to_arrays(self):
+        """Plain arrays describing the mesh (see from_arrays)."""
+        regions = sorted(self.region_material)
+        return {
+            'x': self.x, 'y': self.y, 'data': self.data,
+            'field_names': _np.array(self.field_names, dtype=str),
+            'node_material': self.node_material,
+            'triangles': self.triangles, 'tri_region': self.tri_region,
+            'regions': _np.array(regions, dtype=int),
+            'materials': _np.array([self.region_material[r] for r in regions], dtype=int),
+            'interface_nodes': self.interface_nodes,
+            'interface_material': self.interface_material,
+            'interface_data': self.interface_data,
+            'material_codes': _np.array(list(self.material_names), dtype=int),
+            'material_labels': _np.array(list(self.material_names.values()), dtype=str),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a StrMesh from the output of to_arrays."""
+        region_material = dict(zip(arrays['regions'].tolist(),
+                                   arrays['materials'].tolist()))
+        interface = (arrays['interface_nodes'], arrays['interface_material'],
+                     arrays['interface_data'])
+        material_names = dict(zip(arrays['material_codes'].tolist(),
+                                  arrays['material_labels'].tolist()))
+        return cls(arrays['x'], arrays['y'], arrays['data'],
+                   arrays['field_names'].tolist(), arrays['node_material'],
+                   arrays['triangles'], arrays['tri_region'],
+                   region_material, interface, material_names)
+
+    @property
+    def fields(self):
+        """Named data fields (columns without a 'Q' name are left out)."""
+        return [name for name in self.field_names if not str(name).isdigit()]
+
+    def _sorted_axis(self, axis):
+        # Nodes sorted by coordinate (ties kept in node order) plus the
+        # distinct coordinate values and the first node of each.
+        if axis not in self._axis_index:
+            coord = self.x if axis == 'x' else self.y
+            order = _np.argsort(coord, kind='stable')
+            order = order[~_np.isnan(coord[order])]
+            values = coord[order]
+            uniq, start = _np.unique(values, return_index=True)
+            stop = _np.append(start[1:], len(values))
+            first_seen = _np.minimum.reduceat(order, start) if len(order) else order
+            self._axis_index[axis] = (order, uniq, start, stop, first_seen)
+        return self._axis_index[axis]
+
+    def cutline_nodes(self, cutline: _Tuple[str, float]) -> _np.ndarray:
+        """
+        Node indices on the mesh line closest to a cutline position,
+        sorted along the perpendicular axis.
+
+        Args:
+            cutline: ('x', position) or ('y', position)
+        """
+        axis, pos = cutline
+        if axis not in ('x', 'y'):
+            raise ValueError("cutline axis must be 'x' or 'y'")
+        order, uniq, start, stop, first_seen = self._sorted_axis(axis)
+        dist = _np.abs(uniq - pos)
+        # ties go to the coordinate that appears first in the file
+        candidates = _np.flatnonzero(dist == dist.min())
+        k = candidates[_np.argmin(first_seen[candidates])]
+        ids = order[start[k]:stop[k]]
+        perp = self.y if axis == 'x' else self.x
+        return ids[_np.argsort(perp[ids], kind='stable')]
+
+    def cutline(self, cutline: _Tuple[str, float]) -> _pd.DataFrame:
+        """
+        DataFrame of node values along a cutline.
+
+        Args:
+            cutline: ('x', position) or ('y', position)
+
+        Returns:
+            DataFrame where rows are mesh nodes closest to the cutline,
+            columns are named by the data keys plus the perpendicular coordinate.
+        """
+        ids = self.cutline_nodes(cutline)
+        keep = [i for i, name in enumerate(self.field_names)
+                if not str(name).isdigit()]
+        df = _pd.DataFrame(self.data[_np.ix_(ids, keep)],
+                           columns=list(self.field_names[keep]))
+        if cutline[0] == 'x':
+            df['y'] = self.y[ids]
+        else:
+            df['x'] = self.x[ids]
+        return df
+
+
+    @property
+    def tri_material(self) -> _np.ndarray:
+        """Material code of each triangle (-1 for regions without 'r' record)."""
+        regions = _np.array(sorted(self.region_material), dtype=int)
+        materials = _np.array([self.region_material[r] for r in regions], dtype=int)
+        if not len(regions):
+            return _np.full(len(self.tri_region), -1)
+        pos = _np.clip(_np.searchsorted(regions, self.tri_region), 0, len(regions) - 1)
+        return _np.where(regions[pos] == self.tri_region, materials[pos], -1)
+
+    def _field_index(self, fields=None):
+        # Column positions of the requested fields (default: all named ones)
+        if fields is None:
+            fields = self.fields
+        elif isinstance(fields, str):
+            fields = [fields]
+        names = list(self.field_names)
+        missing = [f for f in fields if f not in names]
+        if missing:
+            raise KeyError(f"Fields not found in mesh: {missing}")
+        return [names.index(f) for f in fields], list(fields)
+
+    def _corner_table(self):
+        # Row of the value table used at each triangle corner. Interface
+        # nodes take the 'n' record of the triangle's own material.
+        if self._corner_rows is None:
+            rows = self.triangles.copy()
+            if len(self.interface_nodes) and len(self.triangles):
+                tri_mat = self.tri_material
+                n_nodes = len(self.data)
+                # key every (node, material) pair; last extra record wins
+                base = max(tri_mat.max(), self.interface_material.max()) + 2
+                key = self.interface_nodes * base + self.interface_material + 1
+                key_order = _np.argsort(key, kind='stable')
+                sorted_key = key[key_order]
+                corner_key = rows * base + tri_mat[:, None] + 1
+                pos = _np.searchsorted(sorted_key, corner_key, side='right') - 1
+                hit = (pos >= 0) & (sorted_key[_np.clip(pos, 0, None)] == corner_key)
+                rows[hit] = n_nodes + key_order[pos[hit]]
+            self._corner_rows = rows
+        return self._corner_rows
+
+    def _vertex_values(self, tri, cols):
+        # (n, 3, n_cols) corner values of the given triangles
+        table = self.data[:, cols]
+        if len(self.interface_nodes):
+            table = _np.vstack([table, self.interface_data[:, cols]])
+        return table[self._corner_table()[tri]]
+
+    def _build_locator(self):
+        # Uniform bucket grid over the triangle bounding boxes, stored as
+        # CSR arrays (cell_start, cell_tris); roughly one triangle per cell.
+        tx = self.x[self.triangles]
+        ty = self.y[self.triangles]
+        x0, x1 = _np.nanmin(tx), _np.nanmax(tx)
+        y0, y1 = _np.nanmin(ty), _np.nanmax(ty)
+        wx, wy = max(x1 - x0, 1e-12), max(y1 - y0, 1e-12)
+        n_tri = len(self.triangles)
+        nx = int(_np.clip(_np.ceil(_np.sqrt(n_tri * wx / wy)), 1, n_tri))
+        ny = int(_np.clip(_np.ceil(n_tri / nx), 1, n_tri))
+        dx, dy = wx / nx, wy / ny
+
+        ix0 = _np.clip(((tx.min(1) - x0) // dx).astype(int), 0, nx - 1)
+        ix1 = _np.clip(((tx.max(1) - x0) // dx).astype(int), 0, nx - 1)
+        iy0 = _np.clip(((ty.min(1) - y0) // dy).astype(int), 0, ny - 1)
+        iy1 = _np.clip(((ty.max(1) - y0) // dy).astype(int), 0, ny - 1)
+        width = ix1 - ix0 + 1
+        count = width * (iy1 - iy0 + 1)
+        tri = _np.repeat(_np.arange(n_tri), count)
+        offset = _np.arange(count.sum()) - _np.repeat(_np.cumsum(count) - count, count)
+        width = _np.repeat(width, count)
+        cell = ((_np.repeat(iy0, count) + offset // width) * nx
+                + _np.repeat(ix0, count) + offset % width)
+        order = _np.argsort(cell, kind='stable')
+        cell_start = _np.searchsorted(cell[order], _np.arange(nx * ny + 1))
+
+        # barycentric denominators, zero for degenerate triangles
+        det = ((ty[:, 1] - ty[:, 2]) * (tx[:, 0] - tx[:, 2])
+               + (tx[:, 2] - tx[:, 1]) * (ty[:, 0] - ty[:, 2]))
+        self._locator = dict(x0=x0, y0=y0, dx=dx, dy=dy, nx=nx, ny=ny,
+                             cell_start=cell_start, cell_tris=tri[order],
+                             tx=tx, ty=ty, det=det)
+        return self._locator
+
+    def locate(self, x, y, tol=1e-9):
+        """
+        Find the triangle holding each point and its barycentric weights.
+
+        Args:
+            x, y: point coordinates (scalars or arrays of equal shape)
+            tol: slack on the weights so points on edges are found
+
+        Returns:
+            (tri, weights): triangle index per point (-1 when the point is
+            outside the mesh) and (n, 3) barycentric weights (NaN outside).
+        """
+        if not len(self.triangles):
+            raise ValueError("No triangle ('t') records in mesh.")
+        loc = self._locator or self._build_locator()
+        px = _np.atleast_1d(_np.asarray(x, dtype=float)).ravel()
+        py = _np.atleast_1d(_np.asarray(y, dtype=float)).ravel()
+        n = len(px)
+
+        cx = _np.floor((px - loc['x0']) / loc['dx'])
+        cy = _np.floor((py - loc['y0']) / loc['dy'])
+        # points exactly on the far edge belong to the last cell
+        cx[px == loc['x0'] + loc['nx'] * loc['dx']] = loc['nx'] - 1
+        cy[py == loc['y0'] + loc['ny'] * loc['dy']] = loc['ny'] - 1
+        inside = (cx >= 0) & (cx < loc['nx']) & (cy >= 0) & (cy < loc['ny'])
+        cell = _np.where(inside, cy * loc['nx'] + cx, 0).astype(int)
+        lo = loc['cell_start'][cell]
+        count = _np.where(inside, loc['cell_start'][cell + 1] - lo, 0)
+
+        # test every (point, candidate triangle) pair of the point's cell
+        pt = _np.repeat(_np.arange(n), count)
+        offset = _np.arange(count.sum()) - _np.repeat(_np.cumsum(count) - count, count)
+        cand = loc['cell_tris'][_np.repeat(lo, count) + offset]
+        tx, ty, det = loc['tx'][cand], loc['ty'][cand], loc['det'][cand]
+        qx, qy = px[pt] - tx[:, 2], py[pt] - ty[:, 2]
+        with _np.errstate(divide='ignore', invalid='ignore'):
+            l1 = ((ty[:, 1] - ty[:, 2]) * qx + (tx[:, 2] - tx[:, 1]) * qy) / det
+            l2 = ((ty[:, 2] - ty[:, 0]) * qx + (tx[:, 0] - tx[:, 2]) * qy) / det
+        l3 = 1.0 - l1 - l2
+        hit = (det != 0) & (l1 >= -tol) & (l2 >= -tol) & (l3 >= -tol)
+
+        # first matching triangle per point
+        hit_idx = _np.flatnonzero(hit)
+        first_pt, first = _np.unique(pt[hit_idx], return_index=True)
+        found = hit_idx[first]
+        tri = _np.full(n, -1)
+        weights = _np.full((n, 3), _np.nan)
+        tri[first_pt] = cand[found]
+        weights[first_pt] = _np.column_stack([l1[found], l2[found], l3[found]])
+        return tri, weights
+
+    def interpolate(self, x, y, fields=None) -> _np.ndarray:
+        """
+        Barycentric interpolation of node fields at arbitrary points.
+
+        Args:
+            x, y: point coordinates
+            fields: field name or list of names (default: all named fields)
+
+        Returns:
+            (n_points, n_fields) array, NaN for points outside the mesh.
+        """
+        cols, _ = self._field_index(fields)
+        tri, weights = self.locate(x, y)
+        out = _np.full((len(tri), len(cols)), _np.nan)
+        ok = tri >= 0
+        corner = self._vertex_values(tri[ok], cols)
+        out[ok] = _np.einsum('nk,nkf->nf', weights[ok], corner)
+        return out
+
+    def probe(self, x, y, fields=None) -> _pd.DataFrame:
+        """
+        Interpolated field values at arbitrary points.
+
+        Args:
+            x, y: point coordinates (scalars or arrays)
+            fields: field name or list of names (default: all named fields)
+
+        Returns:
+            DataFrame with 'x', 'y' and one column per field.
+        """
+        px = _np.atleast_1d(_np.asarray(x, dtype=float)).ravel()
+        py = _np.atleast_1d(_np.asarray(y, dtype=float)).ravel()
+        _, names = self._field_index(fields)
+        df = _pd.DataFrame(self.interpolate(px, py, fields), columns=names)
+        df.insert(0, 'y', py)
+        df.insert(0, 'x', px)
+        return df
+
+    def probe_polyline(self, points, num=200, fields=None) -> _pd.DataFrame:
+        """
+        Interpolated field values sampled evenly along a polyline.
+
+        Args:
+            points: sequence of (x, y) vertices
+            num: number of samples over the whole polyline
+            fields: field name or list of names (default: all named fields)
+
+        Returns:
+            DataFrame with 'distance' along the path, 'x', 'y' and the fields.
+        """
+        points = _np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) < 2:
+            raise ValueError("polyline needs at least two points")
+        seg = _np.hypot(*_np.diff(points, axis=0).T)
+        knots = _np.concatenate([[0.0], _np.cumsum(seg)])
+        distance = _np.linspace(0.0, knots[-1], num)
+        px = _np.interp(distance, knots, points[:, 0])
+        py = _np.interp(distance, knots, points[:, 1])
+        df = self.probe(px, py, fields)
+        df.insert(0, 'distance', distance)
+        return df
+
+    def probe_line(self, start, end, num=200, fields=None) -> _pd.DataFrame:
+        """
+        Interpolated field values along a straight segment, at any angle.
+
+        Args:
+            start, end: (x, y) end points of the segment
+            num: number of samples
+            fields: field name or list of names (default: all named fields)
+
+        Returns:
+            DataFrame with 'distance' from start, 'x', 'y' and the fields.
+        """
+        return self.probe_polyline([start, end], num, fields)
+
+
+    def triangle_areas(self) -> _np.ndarray:
+        """Area of every triangle, in squared coordinate units (um^2)."""
+        if self._areas is None:
+            tx = self.x[self.triangles]
+            ty = self.y[self.triangles]
+            self._areas = 0.5 * _np.abs((tx[:, 1] - tx[:, 0]) * (ty[:, 2] - ty[:, 0])
+                                        - (tx[:, 2] - tx[:, 0]) * (ty[:, 1] - ty[:, 0]))
+        return self._areas
+
+    def region_mask(self, region=None, material=None) -> _np.ndarray:
+        """
+        Boolean mask of the triangles in the given region(s) and material(s).
+
+        Args:
+            region: region number or list of numbers (None: any region)
+            material: material name (e.g. 'Silicon') or code, or a list of
+                them (None: any material)
+        """
+        mask = _np.ones(len(self.triangles), dtype=bool)
+        if region is not None:
+            mask &= _np.isin(self.tri_region, _np.atleast_1d(region))
+        if material is not None:
+            codes = []
+            by_name = {name: code for code, name in self.material_names.items()}
+            for m in _np.atleast_1d(_np.asarray(material, dtype=object)):
+                if isinstance(m, str):
+                    if m not in by_name:
+                        raise ValueError(f"Unknown material '{m}', "
+                                         f"available: {sorted(by_name)}")
+                    codes.append(by_name[m])
+                else:
+                    codes.append(int(m))
+            mask &= _np.isin(self.tri_material, codes)
+        return mask
+
+    def _reduce(self, fields, region, material, how):
+        cols, names = self._field_index(fields)
+        tri = _np.flatnonzero(self.region_mask(region, material))
+        corner = self._vertex_values(tri, cols)
+        if how == 'max':
+            out = _np.nanmax(corner, axis=(0, 1)) if len(tri) else _np.full(len(cols), _np.nan)
+        elif how == 'min':
+            out = _np.nanmin(corner, axis=(0, 1)) if len(tri) else _np.full(len(cols), _np.nan)
+        else:
+            # exact integral of the linear interpolant: area * corner mean
+            areas = self.triangle_areas()[tri]
+            out = areas @ corner.mean(axis=1)
+            if how == 'mean':
+                out = out / areas.sum()
+        if isinstance(fields, str):
+            return out[0]
+        return _pd.Series(out, index=names)
+
+    def area(self, region=None, material=None) -> float:
+        """Total area of a region / material (um^2)."""
+        return self.triangle_areas()[self.region_mask(region, material)].sum()
+
+    def integrate(self, fields=None, region=None, material=None):
+        """
+        Area integral of fields over a region / material.
+
+        The field is linear on each triangle, so the integral is exact for
+        the mesh solution. The result is in field units x um^2; multiply by
+        1e-8 for cm^2 (e.g. '/cm~#' densities to charge per cm of width).
+
+        Args:
+            fields: field name (returns a float) or list of names (returns
+                a Series); default all named fields.
+            region, material: see region_mask()
+        """
+        return self._reduce(fields, region, material, 'integrate')
+
+    def mean(self, fields=None, region=None, material=None):
+        """Area-weighted mean of fields over a region / material."""
+        return self._reduce(fields, region, material, 'mean')
+
+    def max(self, fields=None, region=None, material=None):
+        """Largest node value of fields within a region / material."""
+        return self._reduce(fields, region, material, 'max')
+
+    def min(self, fields=None, region=None, material=None):
+        """Smallest node value of fields within a region / material."""
+        return self._reduce(fields, region, material, 'min')
+
+
+    def rasterize(self, fields=None, x=None, y=None, nx=200, ny=200,
+                  out=None, chunk_size=50000, dtype=float):
+        """
+        Resample fields onto a regular x-y grid through the triangle mesh.
+
+        Triangles are processed chunk_size at a time, so memory use is
+        bounded by the chunk and the output array. Grid points outside the
+        mesh are NaN.
+
+        Args:
+            fields: field name or list of names (default: all named fields)
+            x, y: increasing grid coordinates (default: nx/ny points spanning
+                the mesh)
+            nx, ny: grid size when x/y are not given
+            out: None (new array), a path (a memory-mapped .npy file is
+                created there), or an existing array of the output shape,
+                e.g. one slot of a larger memmap
+            chunk_size: triangles per chunk
+            dtype: output dtype, e.g. float32 for training data
+
+        Returns:
+            (n_fields, ny, nx) array, or (ny, nx) for a single field name.
+        """
+        cols, _ = self._field_index(fields)
+        if x is None:
+            x = _np.linspace(_np.nanmin(self.x), _np.nanmax(self.x), nx)
+        if y is None:
+            y = _np.linspace(_np.nanmin(self.y), _np.nanmax(self.y), ny)
+        gx = _np.asarray(x, dtype=float)
+        gy = _np.asarray(y, dtype=float)
+        shape = (len(cols), len(gy), len(gx))
+
+        if out is None:
+            out = _np.empty(shape, dtype=dtype)
+        elif isinstance(out, (str, _os.PathLike)):
+            out = _np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}")
+        out[...] = _np.nan
+        flat = out.reshape(len(cols), -1)
+
+        for start in range(0, len(self.triangles), chunk_size):
+            tri = _np.arange(start, min(start + chunk_size, len(self.triangles)))
+            tx = self.x[self.triangles[tri]]
+            ty = self.y[self.triangles[tri]]
+            # grid points inside each triangle's bounding box
+            ix0 = _np.searchsorted(gx, tx.min(1), 'left')
+            ix1 = _np.searchsorted(gx, tx.max(1), 'right')
+            iy0 = _np.searchsorted(gy, ty.min(1), 'left')
+            iy1 = _np.searchsorted(gy, ty.max(1), 'right')
+            width = _np.clip(ix1 - ix0, 0, None)
+            count = width * _np.clip(iy1 - iy0, 0, None)
+            k = _np.repeat(_np.arange(len(tri)), count)
+            offset = _np.arange(count.sum()) - _np.repeat(_np.cumsum(count) - count, count)
+            width = _np.repeat(width, count)
+            gi = _np.repeat(ix0, count) + offset % width
+            gj = _np.repeat(iy0, count) + offset // width
+
+            cx, cy = tx[k], ty[k]
+            qx, qy = gx[gi] - cx[:, 2], gy[gj] - cy[:, 2]
+            det = ((cy[:, 1] - cy[:, 2]) * (cx[:, 0] - cx[:, 2])
+                   + (cx[:, 2] - cx[:, 1]) * (cy[:, 0] - cy[:, 2]))
+            with _np.errstate(divide='ignore', invalid='ignore'):
+                l1 = ((cy[:, 1] - cy[:, 2]) * qx + (cx[:, 2] - cx[:, 1]) * qy) / det
+                l2 = ((cy[:, 2] - cy[:, 0]) * qx + (cx[:, 0] - cx[:, 2]) * qy) / det
+            l3 = 1.0 - l1 - l2
+            inside = (det != 0) & (l1 >= -1e-9) & (l2 >= -1e-9) & (l3 >= -1e-9)
+
+            weights = _np.column_stack([l1[inside], l2[inside], l3[inside]])
+            corner = self._vertex_values(tri[k[inside]], cols)
+            flat[:, gj[inside] * len(gx) + gi[inside]] = _np.einsum('nk,nkf->fn', weights, corner)
+
+        if isinstance(out, _np.memmap):
+            out.flush()
+        return out[0] if isinstance(fields, str) else out
+
+
+    def add_field(self, name, values, interface_values=None):
+        """
+        Add a node field, usable by cutline, probe, rasterize and reductions.
+
+        Args:
+            name: new field name
+            values: (n_nodes,) node values
+            interface_values: values of the extra interface records
+                (default: the value of the node)
+        """
+        if name in list(self.field_names):
+            raise ValueError(f"Field '{name}' already exists.")
+        values = _np.asarray(values, dtype=float).reshape(len(self.data))
+        if interface_values is None:
+            interface_values = values[self.interface_nodes]
+        interface_values = _np.asarray(interface_values, dtype=float)
+        self.data = _np.column_stack([self.data, values])
+        self.interface_data = _np.column_stack(
+            [self.interface_data, interface_values.reshape(len(self.interface_nodes))])
+        self.field_names = _np.append(self.field_names, _np.array([name], dtype=object))
+
+    def gradient(self, fields=None, scale=1.0):
+        """
+        Node gradients of fields from the piecewise-linear mesh solution.
+
+        The gradient is constant on each triangle; node values are the
+        area-weighted mean over the triangles around the node, taken
+        separately per material at interface nodes.
+
+        Args:
+            fields: field name or list of names (default: all named fields)
+            scale: factor applied to the result; the gradient is per
+                coordinate unit (um), use 1e4 for per cm
+
+        Returns:
+            (dx, dy, interface_dx, interface_dy): (n_nodes, n_fields) node
+            gradients and (n_interface, n_fields) values of the interface
+            records. Nodes outside every triangle are NaN.
+        """
+        cols, _ = self._field_index(fields)
+        tri = _np.arange(len(self.triangles))
+        f = self._vertex_values(tri, cols)
+        tx = self.x[self.triangles]
+        ty = self.y[self.triangles]
+        x10, x20 = tx[:, 1] - tx[:, 0], tx[:, 2] - tx[:, 0]
+        y10, y20 = ty[:, 1] - ty[:, 0], ty[:, 2] - ty[:, 0]
+        det = x10 * y20 - x20 * y10
+        ok = det != 0
+        det = _np.where(ok, det, 1.0)[:, None]
+        f10, f20 = f[:, 1] - f[:, 0], f[:, 2] - f[:, 0]
+        gx = (f10 * y20[:, None] - f20 * y10[:, None]) / det
+        gy = (f20 * x10[:, None] - f10 * x20[:, None]) / det
+
+        # area-weighted scatter of triangle gradients onto value-table rows
+        rows = self._corner_table()[ok].ravel()
+        area = _np.repeat(0.5 * _np.abs(det[ok, 0]), 3)
+        n_rows = len(self.data) + len(self.interface_nodes)
+        weight = _np.bincount(rows, weights=area, minlength=n_rows)
+        acc_x = _np.zeros((n_rows, len(cols)))
+        acc_y = _np.zeros((n_rows, len(cols)))
+        _np.add.at(acc_x, rows, area[:, None] * _np.repeat(gx[ok], 3, axis=0))
+        _np.add.at(acc_y, rows, area[:, None] * _np.repeat(gy[ok], 3, axis=0))
+        with _np.errstate(invalid='ignore', divide='ignore'):
+            dx = scale * acc_x / weight[:, None]
+            dy = scale * acc_y / weight[:, None]
+        n = len(self.data)
+        # interface nodes missing from a material fall back to the node value
+        dx_i, dy_i = dx[n:], dy[n:]
+        fill = _np.isnan(dx_i)
+        dx_i[fill] = dx[:n][self.interface_nodes][fill]
+        dy_i[fill] = dy[:n][self.interface_nodes][fill]
+        return dx[:n], dy[:n], dx_i, dy_i
+
+    def add_gradient(self, fields, scale=1.0, names=None):
+        """
+        Add the x and y gradients of fields as new fields.
+
+        Args:
+            fields: field name or list of names
+            scale: see gradient()
+            names: list of (x name, y name) per field
+                (default: 'd(<field>)/dx' and 'd(<field>)/dy')
+
+        Returns:
+            List of the added field names.
+        """
+        _, fields = self._field_index(fields)
+        if names is None:
+            names = [(f"d({f})/dx", f"d({f})/dy") for f in fields]
+        dx, dy, dx_i, dy_i = self.gradient(fields, scale)
+        added = []
+        for k, (name_x, name_y) in enumerate(names):
+            self.add_field(name_x, dx[:, k], dx_i[:, k])
+            self.add_field(name_y, dy[:, k], dy_i[:, k])
+            added += [name_x, name_y]
+        return added
+
+    def add_magnitude(self, name, x_field, y_field):
+        """Add the magnitude of a vector field from its components, e.g. |E|."""
+        cols, _ = self._field_index([x_field, y_field])
+        self.add_field(name, _np.hypot(self.data[:, cols[0]], self.data[:, cols[1]]),
+                       _np.hypot(self.interface_data[:, cols[0]],
+                                 self.interface_data[:, cols[1]]))
+
+    def _trace(self, cols, px, py, step, max_steps, normalize):
+        # RK2 (midpoint) paths of all seeds at once: (max_steps + 1, n) x and y
+        fields = list(self.field_names[cols])
+        xs = _np.full((max_steps + 1, len(px)), _np.nan)
+        ys = _np.full((max_steps + 1, len(px)), _np.nan)
+        xs[0], ys[0] = px, py
+        active = _np.isfinite(px) & _np.isfinite(py)
+
+        def direction(x, y):
+            v = self.interpolate(x, y, fields)
+            norm = _np.hypot(v[:, 0], v[:, 1])
+            ok = _np.isfinite(norm) & (norm > 0)
+            if normalize:
+                v = v / _np.where(ok, norm, 1.0)[:, None]
+            return v, ok
+
+        for k in range(max_steps):
+            idx = _np.flatnonzero(active)
+            if not len(idx):
+                break
+            x, y = xs[k, idx], ys[k, idx]
+            v, ok = direction(x, y)
+            if k > 0:
+                # the last step left the mesh: drop that point
+                outside = ~_np.isfinite(v[:, 0])
+                xs[k, idx[outside]] = ys[k, idx[outside]] = _np.nan
+            vm, ok_m = direction(x + 0.5 * step * v[:, 0], y + 0.5 * step * v[:, 1])
+            # stop where the field reverses within a step (sink / stagnation)
+            ok &= ok_m & ((v * vm).sum(axis=1) > 0)
+            active[idx[~ok]] = False
+            idx, vm = idx[ok], vm[ok]
+            xs[k + 1, idx] = x[ok] + step * vm[:, 0]
+            ys[k + 1, idx] = y[ok] + step * vm[:, 1]
+        else:
+            # points of the final step that left the mesh
+            last = _np.isnan(self.interpolate(xs[-1], ys[-1], fields[:1])[:, 0])
+            xs[-1, last] = ys[-1, last] = _np.nan
+        return xs, ys
+
+    def streamlines(self, x_field, y_field, x, y, step=None, max_steps=500,
+                    direction='forward', normalize=True) -> _pd.DataFrame:
+        """
+        Trace streamlines of a vector field, e.g. current density (Jx, Jy).
+
+        All seeds advance together with a midpoint (RK2) step on the
+        barycentric interpolation of the field; a line stops when it leaves
+        the mesh or reaches a point where the field vanishes or reverses.
+
+        Args:
+            x_field, y_field: names of the vector components
+            x, y: seed coordinates (scalars or arrays)
+            step: step length in coordinate units (um) when normalize,
+                else the factor applied to the field
+                (default: half the median triangle size)
+            max_steps: maximum steps per direction
+            direction: 'forward', 'backward' or 'both'
+            normalize: follow the unit direction (fixed arc length per step)
+
+        Returns:
+            DataFrame with 'line' (seed index), 'step' (negative when traced
+            backward), 'x' and 'y', ordered along each line.
+        """
+        if direction not in ('forward', 'backward', 'both'):
+            raise ValueError("direction must be 'forward', 'backward' or 'both'")
+        cols, _ = self._field_index([x_field, y_field])
+        px = _np.atleast_1d(_np.asarray(x, dtype=float)).ravel()
+        py = _np.atleast_1d(_np.asarray(y, dtype=float)).ravel()
+        if step is None:
+            step = 0.5 * _np.sqrt(_np.median(self.triangle_areas()))
+
+        parts = []
+        if direction in ('forward', 'both'):
+            xs, ys = self._trace(cols, px, py, step, max_steps, normalize)
+            parts.append((_np.arange(max_steps + 1), xs, ys))
+        if direction in ('backward', 'both'):
+            xs, ys = self._trace(cols, px, py, -step, max_steps, normalize)
+            skip = 1 if direction == 'both' else 0     # seed already in forward
+            parts.append((-_np.arange(max_steps + 1)[skip:], xs[skip:], ys[skip:]))
+
+        steps = _np.concatenate([s for s, _, _ in parts])
+        xs = _np.concatenate([a for _, a, _ in parts])
+        ys = _np.concatenate([b for _, _, b in parts])
+        line = _np.broadcast_to(_np.arange(len(px)), xs.shape)
+        step_index = _np.broadcast_to(steps[:, None], xs.shape)
+        keep = _np.isfinite(xs)
+        df = _pd.DataFrame({'line': line[keep], 'step': step_index[keep],
+                            'x': xs[keep], 'y': ys[keep]})
+        return df.sort_values(['line', 'step'], kind='stable').reset_index(drop=True)
+
+
+def read_str(file_path, cache=None) -> StrMesh:
+    """
+    Parse a Silvaco .str file into a reusable StrMesh.
+
+    Args:
+        file_path: path to the .str file
+        cache: None/False (no cache), True (default cache directory),
+            a cache directory, or a ParseCache instance.
+
+    Returns:
+        StrMesh; call .cutline(('x', pos)) on it as often as needed.
+    """
+    cache = _resolve_cache(cache)
+    if cache is not None:
+        arrays = cache.load(file_path, 'str', _STR_PARSER_VERSION)
+        if arrays is not None:
+            return StrMesh.from_arrays(arrays)
+
+    mesh = StrMesh.from_file(file_path)
+    if cache is not None:
+        cache.store(file_path, 'str', _STR_PARSER_VERSION, mesh.to_arrays())
+    return mesh
+
+
+def read_str_cutline(file_path: str, cutline: _Tuple[str, float], cache=None) -> _pd.DataFrame:
     """
     Parse a Silvaco .str file and return a DataFrame of values along a cutline.
-    
+
+    Parses the whole file; when several cutlines are needed from one
+    structure use read_str() once and call StrMesh.cutline() instead.
+
     Args:
         file_path: path to the .str file
         cutline: ('x', position) or ('y', position)
-    
+        cache: optional parse cache, see read_str()
+
     Returns:
         DataFrame where rows are mesh nodes closest to the cutline,
         columns are named by the data keys.
     """
-    mesh = _defaultdict(lambda: {"x": set(), "y": set()})
-    data_keys = []
-    data_by_id = {}
-    id_to_x = {}
-    id_to_y = {}
+    return read_str(file_path, cache).cutline(cutline)
+
 
+# Records that must match for two .str files to share one mesh
+_STR_GEOMETRY_TAGS = ('c ', 't ', 'r ', 's ', 'Q ')
+
+def _str_geometry_digest(lines):
+    import hashlib
+    digest = hashlib.sha1()
+    for line in lines:
+        if line[:2] in _STR_GEOMETRY_TAGS:
+            digest.update(line.encode())
+    return digest.hexdigest()
+
+def _read_str_node_block(args):
+    # Worker for read_str_series: geometry digest and node tables of a file
+    file_path, n_nodes = args
     with open(file_path, 'r') as f:
-        for line in f:
-            if line.startswith('c '):
-                _, pid, xs, ys, _ = line.split()
-                pid = int(pid)
-                x, y = float(xs), float(ys)
-                id_to_x[pid] = x
-                id_to_y[pid] = y
-                mesh[x]['x'].add(pid)
-                mesh[y]['y'].add(pid)
-
-            elif line.startswith('s '):
-                data_keys = line.split()[1:]
-
-            elif line.startswith('n '):
-                parts = line.split()
-                pid = int(parts[1])+1
-                data_by_id[pid] = list(map(float, parts[2:]))
-
-            elif line.startswith('Q '):
-                parts = _shlex.split(line)
-                ind, name = parts[1], parts[3]
-                for idx, key in enumerate(data_keys):
-                    if key == ind:
-                        data_keys[idx] = name
-
-    if not data_keys:
-        raise ValueError("No data header ('s') found in file.")
-    if not data_by_id:
-        raise ValueError("No node data ('n') found in file.")
-
-    axis, pos = cutline
-    if axis not in ('x', 'y'):
-        raise ValueError("cutline axis must be 'x' or 'y'")
-
-    # find all coords along the chosen axis
-    coords = [k for k, v in mesh.items() if v[axis]]
-    # pick the one closest to pos
-    closest = min(coords, key=lambda c: abs(c - pos))
-    cut_ids = sorted(mesh[closest][axis])
-
-    # build DataFrame
-    cut_dict = {
-        key: [data_by_id[pid][i] for pid in cut_ids]
-        for i, key in enumerate(data_keys)
-    }
-    df = _pd.DataFrame(cut_dict)
-    # drop purely numeric columns
-    df = df.drop(df.filter(regex=r'^\d+$').columns, axis=1)
-    # Build perpendicular coords
-    if axis == 'x':
-        df['y'] = [id_to_y[pid] for pid in cut_ids]
-        df.sort_values(by='y', inplace=True)
-        df.reset_index(drop=True, inplace=True)
+        lines = f.readlines()
+    node_rec = _records_to_array([line[2:] for line in lines if line.startswith('n ')])
+    if not len(node_rec):
+        raise ValueError(f"No node data ('n') found in {file_path}.")
+    data, interface = _node_tables(node_rec, n_nodes)
+    return _str_geometry_digest(lines), data, interface
+
+
+class StrSeries:
+    """
+    Stack of .str files that share one mesh, e.g. one file per bias point.
+
+    The geometry is parsed once; every file contributes only its node data,
+    stored as a (file, node, field) array. Cutlines and probes are applied
+    to the whole stack at once.
+
+    Attributes:
+        mesh: StrMesh of the first file (geometry and field names).
+        data: (n_files, n_nodes, n_fields) node data.
+        interface_data: (n_files, n_interface, n_fields) extra interface records.
+        labels: one label per file (bias values or file names).
+    """
+
+    def __init__(self, mesh, data, interface_data, labels):
+        self.mesh = mesh
+        self.data = _np.asarray(data, dtype=float)
+        self.interface_data = _np.asarray(interface_data, dtype=float)
+        self.labels = list(labels)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i) -> StrMesh:
+        """StrMesh of file i, sharing geometry and spatial index with the series."""
+        mesh = _copy.copy(self.mesh)
+        mesh.data = self.data[i]
+        mesh.interface_data = self.interface_data[i]
+        return mesh
+
+    def _stack_table(self, cols):
+        # (n_files, n_nodes + n_interface, n_cols) value tables
+        return _np.concatenate([self.data[:, :, cols],
+                                self.interface_data[:, :, cols]], axis=1)
+
+    def cutline(self, cutline: _Tuple[str, float], fields=None):
+        """
+        Node values along a cutline for every file.
+
+        Args:
+            cutline: ('x', position) or ('y', position)
+            fields: field name or list of names (default: all named fields)
+
+        Returns:
+            (coord, values): perpendicular coordinate of the cutline nodes and
+            a (n_files, n_points, n_fields) array.
+        """
+        cols, _ = self.mesh._field_index(fields)
+        ids = self.mesh.cutline_nodes(cutline)
+        coord = self.mesh.y[ids] if cutline[0] == 'x' else self.mesh.x[ids]
+        return coord, self.data[:, ids][:, :, cols]
+
+    def probe(self, x, y, fields=None) -> _np.ndarray:
+        """
+        Interpolated field values at arbitrary points for every file.
+
+        Point location is done once for the whole stack.
+
+        Returns:
+            (n_files, n_points, n_fields) array, NaN outside the mesh.
+        """
+        cols, _ = self.mesh._field_index(fields)
+        tri, weights = self.mesh.locate(x, y)
+        out = _np.full((len(self), len(tri), len(cols)), _np.nan)
+        ok = tri >= 0
+        rows = self.mesh._corner_table()[tri[ok]]
+        corner = self._stack_table(cols)[:, rows]
+        out[:, ok] = _np.einsum('nk,bnkf->bnf', weights[ok], corner)
+        return out
+
+    def probe_line(self, start, end, num=200, fields=None):
+        """
+        Interpolated values along a segment for every file.
+
+        Returns:
+            (distance, values) with values shaped (n_files, num, n_fields).
+        """
+        start = _np.asarray(start, dtype=float)
+        end = _np.asarray(end, dtype=float)
+        t = _np.linspace(0.0, 1.0, num)
+        points = start + t[:, None] * (end - start)
+        distance = t * _np.hypot(*(end - start))
+        return distance, self.probe(points[:, 0], points[:, 1], fields)
+
+
+def read_str_series(file_paths, labels=None, workers=1, cache=None) -> StrSeries:
+    """
+    Read .str files that share a mesh (e.g. one per bias point) as a stack.
+
+    The first file is parsed fully; the others only have their node data
+    converted, after checking that their mesh records match the first file.
+
+    Args:
+        file_paths: .str files, in stack order
+        labels: label per file (e.g. bias values; default: file names)
+        workers: worker processes for the node data; 1 parses in this
+            process, None uses one process per CPU
+        cache: optional parse cache for the first file, see read_str()
+
+    Returns:
+        StrSeries
+    """
+    file_paths = [_Path(f) for f in file_paths]
+    if not file_paths:
+        raise ValueError("No .str files given.")
+    if labels is None:
+        labels = [f.stem for f in file_paths]
+    mesh = read_str(file_paths[0], cache)
+    with open(file_paths[0], 'r') as f:
+        reference = _str_geometry_digest(f)
+
+    jobs = [(f, len(mesh.x)) for f in file_paths[1:]]
+    if workers == 1:
+        results = list(map(_read_str_node_block, jobs))
     else:
-        df['x'] = [id_to_x[pid] for pid in cut_ids]
-        df.sort_values(by='x', inplace=True)
-        df.reset_index(drop=True, inplace=True)
-    return df
\ No newline at end of file
+        with _ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_str_node_block, jobs))
+
+    data = [mesh.data]
+    interface_data = [mesh.interface_data]
+    for (file_path, _), (digest, node_data, interface) in zip(jobs, results):
+        if digest != reference or not _np.array_equal(interface[0], mesh.interface_nodes):
+            raise ValueError(f"{file_path} does not share the mesh of {file_paths[0]}.")
+        data.append(node_data)
+        interface_data.append(interface[2])
+    return StrSeries(mesh, _np.stack(data), _np.stack(interface_data), labels)